@@ -13,6 +13,7 @@ import astropy.time as astime
 import astropy.coordinates as ascoords
 from astropy import units as u
 from .. import units
+from . import earth_orientation
 
 
 class Coordinates:
@@ -36,7 +37,17 @@ class Coordinates:
         ellipticity: Ellipticity of Earth's motion around sun
         J2000: Timestamp of noon, 31 Dec 1999 (UTC)
         earthSpeed: Speed of a point on the surface of Earth
+        fast_lab: If True, earth_motion_lab uses the analytic
+                  transform in earth_motion_lab_fast instead
+                  of AstroPy
     """ 
+    # Rotation from ICRS (J2000 equatorial) to galactic cartesian
+    # coordinates. The transpose goes the other way.
+    _icrs_to_gal = np.array(
+        [[-0.0548755604162154,-0.8734370902348850,-0.4838350155487132],
+         [ 0.4941094278755837,-0.4448296299600112, 0.7469822444972189],
+         [-0.8676661490190047,-0.1980763734312015, 0.4559837761750669]])
+
     def __init__(self):
         """ Initialize various important constants used in 
             calculations.
@@ -59,25 +70,52 @@ class Coordinates:
                                  tzinfo = dt.timezone.utc)
 
         self.earthSpeed = 6371. * units.km / (86400. * units.sec)
+        self.fast_lab = False
+
+    def days_since_J2000(self,timestamp):
+        """
+        Convert timestamps to days since J2000.
+
+        Args:
+            timestamp: A datetime, a NumPy datetime64 value or array
+                (taken to be UTC), or a float or array of Unix 
+                seconds
+
+        Returns:
+            float or array: The number of days
+        """
+        if isinstance(timestamp,dt.datetime):
+            return (timestamp - self.J2000).total_seconds() / 86400.
+        t = np.asarray(timestamp)
+        if t.dtype.kind == 'M':
+            seconds = ((t - np.datetime64('1970-01-01T00:00:00'))
+                       / np.timedelta64(1,'s'))
+        elif t.dtype.kind == 'O':
+            return np.vectorize(self.days_since_J2000,otypes=[float])(t)
+        else:
+            seconds = t.astype(float)
+        return (seconds - self.J2000.timestamp()) / 86400.
 
     def earth_motion_gal(self,timestamp):
         """ 
         Get the motion of Earth in galactic coordinates 
-        A datetime object is needed in order to get the position
+        A timestamp is needed in order to get the position
         around the sun
 
 
         Args:
-            timestamp (datetime): The timestamp at which we want to do
-                the calculation
+            timestamp: The time at which we want to do the 
+                calculation. A datetime, a NumPy datetime64 
+                value or array (UTC), or a float or array of
+                Unix seconds.
 
         Returns:
-            NumPy array of length 3. The velocity of Earth in galactic
+            NumPy array of length 3 for a single time, or of shape
+            (N,3) for N times. The velocity of Earth in galactic
             coordinates.
 
         """
-        timedelta = timestamp - self.J2000#dt.datetime.fromtimestamp(timestamp) - self.J2000
-        days = timedelta.total_seconds() / 86400.
+        days = np.asarray(self.days_since_J2000(timestamp))[...,np.newaxis]
         L = self.lambdaL0 + self.lambdaL1 * days
         g = self.lambdag0 + self.lambdag1 * days
         lambda_t = L + self.lambdaB * np.sin(g) + self.lambdaC * np.sin(2*g)
@@ -85,6 +123,27 @@ class Coordinates:
         uE = uE_l * np.cos(self.beta) * np.sin(lambda_t - self.lambda_)
         return self.ur + self.us + uE
 
+    def astropy_time(self,timestamp):
+        """
+        Convert timestamps to an AstroPy Time.
+
+        Args:
+            timestamp: A datetime, a NumPy datetime64 value or array
+                (taken to be UTC), or a float or array of Unix 
+                seconds
+
+        Returns:
+            AstroPy Time (scalar or array)
+        """
+        if isinstance(timestamp,dt.datetime):
+            return astime.Time(timestamp)
+        t = np.asarray(timestamp)
+        if t.dtype.kind == 'M':
+            return astime.Time(t,scale='utc')
+        if t.dtype.kind == 'O':
+            return astime.Time(list(t.reshape(-1))).reshape(t.shape)
+        return astime.Time(t.astype(float),format='unix')
+
     def earth_motion_lab(self,timestamp,coord):
         """
         Get the velocity of the lab frame in local coordinates. 
@@ -99,29 +158,120 @@ class Coordinates:
         rotation of Earth. There will be a very slight 
         sidereal modulation of the velocity.
 
+        For an array of N times, all of them are converted 
+        with a single AstroPy transform. For machines without
+        network access, see earth_orientation.use_offline().
+
         Args:
-            timestamp (datetime): The time at which we want to
-                calculate the velocity
+            timestamp: The time at which we want to calculate 
+                the velocity. A datetime, a NumPy datetime64 
+                value or array (UTC), or a float or array of 
+                Unix seconds.
             coord (list or array): The coordinates on Earth at 
                 which we want to do the calculation. Of the 
                 form [lat,lon].
 
         Returns:
-            NumPy array of length 3. The velocity of the lab frame
-            at the given time and place.
+            NumPy array of length 3 for a single time, or of shape
+            (N,3) for N times. The velocity of the lab frame at 
+            the given time and place.
 
         """
+        if self.fast_lab:
+            return self.earth_motion_lab_fast(timestamp,coord)
+
         lat,lon = coord
-        loc = ascoords.EarthLocation(lon=lon*u.deg,lat=lat*u.deg)
-        time = astime.Time(timestamp) # A datetime
+        return self._lab_astropy(timestamp,self.earth_motion_gal(timestamp),
+                                 lat,lon)
+
+    def earth_motion_lab_sites(self,timestamp,coords):
+        """
+        Get the lab frame velocities for several sites at once.
+        The galactic frame velocities are calculated once and 
+        shared by all of the sites.
+
+        With AstroPy, the velocity directions are transformed once
+        to the Earth-fixed ITRS frame for all times, and each site
+        only needs a rotation to east/north/up. This leaves out 
+        the diurnal aberration, so the directions differ from 
+        earth_motion_lab by up to about 1.5e-6 radians. If fast_lab
+        is set, the analytic transform is used for every 
+        (site,time) pair instead.
+
+        Args:
+            timestamp: The times at which we want to calculate 
+                the velocity. A datetime, a NumPy datetime64 
+                value or array (UTC), or a float or array of 
+                Unix seconds.
+            coords: (S,2) array of [lat,lon], e.g. from 
+                locations.all_sites()
+
+        Returns:
+            NumPy array of shape (S,N,3) for N times, or (S,3) for 
+            a single time
+        """
+        coords = np.asarray(coords,dtype=float)
         earth_gal = self.earth_motion_gal(timestamp)
-        earth_vel = np.sqrt(earth_gal.dot(earth_gal))
-        gal_lon = np.arctan2(earth_gal[1],earth_gal[0])
-        gal_lat = 0.5 * np.pi - np.arccos(earth_gal[2] / earth_vel)
+        # Sites along the first axis, broadcast against the times
+        shape = (coords.shape[0],) + (1,) * (earth_gal.ndim - 1)
+        lat = coords[:,0].reshape(shape)
+        lon = coords[:,1].reshape(shape)
+        if self.fast_lab:
+            return self._lab_fast(timestamp,earth_gal,lat,lon)
+
+        time,gal,earth_vel = self._galactic_coords(timestamp,earth_gal)
+        itrs = gal.transform_to(ascoords.ITRS(obstime=time))
+        x,y,z = itrs.cartesian.xyz.value * earth_vel
+
+        lat = lat * units.deg
+        lon = lon * units.deg
+        cl,sl = np.cos(lon),np.sin(lon)
+        cphi,sphi = np.cos(lat),np.sin(lat)
+        east = -sl * x + cl * y
+        north = -sphi * (cl * x + sl * y) + cphi * z
+        up = cphi * (cl * x + sl * y) + sphi * z
+        v_earth = np.stack((east,north,up),axis=-1)
+
+        # The lab frame is also traveling west due to Earth's rotation
+        v_rot = np.array([-self.earthSpeed,0,0])
+        return v_earth + v_rot
+
+    def _galactic_coords(self,timestamp,earth_gal):
+        """
+        Set up the AstroPy objects shared by the galactic to lab
+        frame transforms.
+
+        Args:
+            timestamp: The times
+            earth_gal: Galactic frame velocities (...,3)
+
+        Returns:
+            (time,gal,earth_vel): The AstroPy Time, the velocity
+            directions as a galactic SkyCoord, and the speeds
+        """
+        time = earth_orientation.prepare_time(self.astropy_time(timestamp))
+        earth_vel = np.sqrt(np.sum(earth_gal*earth_gal,axis=-1))
+        gal_lon = np.arctan2(earth_gal[...,1],earth_gal[...,0])
+        gal_lat = 0.5 * np.pi - np.arccos(earth_gal[...,2] / earth_vel)
+        gal = ascoords.SkyCoord(ascoords.Galactic(l = gal_lon * u.rad,
+                                                  b = gal_lat * u.rad))
+        return time,gal,earth_vel
 
+    def _lab_astropy(self,timestamp,earth_gal,lat,lon):
+        """
+        Transform galactic velocities to the lab frame with AstroPy.
+
+        Args:
+            timestamp: The times
+            earth_gal: Galactic frame velocities (...,3)
+            lat,lon: Site coordinates in degrees, which broadcast
+                against the times
 
-        gal = ascoords.Galactic(l = gal_lon * u.rad,b = gal_lat * u.rad)
-        gal_0 = ascoords.SkyCoord(gal)
+        Returns:
+            The lab frame velocities
+        """
+        loc = ascoords.EarthLocation(lon=lon*u.deg,lat=lat*u.deg)
+        time,gal_0,earth_vel = self._galactic_coords(timestamp,earth_gal)
         altaz = ascoords.AltAz(obstime=time,location=loc,pressure=0)
         altaz_coords = gal_0.transform_to(altaz)
         
@@ -129,12 +279,11 @@ class Coordinates:
 
         az = altaz_coords.data.lon.to(u.rad).value
         alt = altaz_coords.data.lat.to(u.rad).value
-        v_earth = np.zeros(3)
         theta = 0.5 * np.pi - alt
         phi = 0.5 * np.pi - az
-        v_earth[0] = np.sin(theta) * np.cos(phi) * earth_vel
-        v_earth[1] = np.sin(theta) * np.sin(phi) * earth_vel
-        v_earth[2] = np.cos(theta) * earth_vel
+        v_earth = np.stack((np.sin(theta) * np.cos(phi) * earth_vel,
+                            np.sin(theta) * np.sin(phi) * earth_vel,
+                            np.cos(theta) * earth_vel),axis=-1)
 
 
         # The lab frame is also traveling west due to Earth's rotation
@@ -142,3 +291,114 @@ class Coordinates:
         v_rot = np.array([-self.earthSpeed,0,0])
         v_tot = v_earth + v_rot
         return v_tot
+
+    def earth_motion_lab_fast(self,timestamp,coord):
+        """
+        Same as earth_motion_lab, but with an analytic transform
+        from galactic to local coordinates in pure NumPy:
+        a fixed galactic to J2000 equatorial rotation, IAU 1976
+        precession to the equinox of date, and a rotation to
+        east/north/up using the mean sidereal time (IAU 1982, 
+        with UT1 = UTC). Nutation, aberration and polar motion
+        are ignored, which limits the accuracy to about 1.3e-4
+        radians (30 arcsec). See validate_fast_lab().
+
+        Args:
+            timestamp: The time at which we want to calculate 
+                the velocity. A datetime, a NumPy datetime64 
+                value or array (UTC), or a float or array of 
+                Unix seconds.
+            coord (list or array): The coordinates on Earth at 
+                which we want to do the calculation. Of the 
+                form [lat,lon].
+
+        Returns:
+            NumPy array of length 3 for a single time, or of shape
+            (N,3) for N times. The velocity of the lab frame at 
+            the given time and place.
+        """
+        lat,lon = coord
+        return self._lab_fast(timestamp,self.earth_motion_gal(timestamp),
+                              lat,lon)
+
+    def _lab_fast(self,timestamp,earth_gal,lat,lon):
+        """
+        Transform galactic velocities to the lab frame with the
+        analytic transform.
+
+        Args:
+            timestamp: The times
+            earth_gal: Galactic frame velocities (...,3)
+            lat,lon: Site coordinates in degrees, which broadcast
+                against the times
+
+        Returns:
+            The lab frame velocities
+        """
+        lat = np.asarray(lat,dtype=float) * units.deg
+        lon = np.asarray(lon,dtype=float) * units.deg
+        # Days and centuries since J2000.0 (2000 Jan 1, 12:00)
+        d = np.asarray(self.days_since_J2000(timestamp)) - 1.
+        T = d / 36525.
+
+        # J2000 equatorial coordinates
+        eq = earth_gal.dot(self._icrs_to_gal)
+
+        # Precession to the mean equinox of date
+        arcsec = units.deg / 3600.
+        zeta = (2306.2181 * T + 0.30188 * T*T + 0.017998 * T**3) * arcsec
+        z = (2306.2181 * T + 1.09468 * T*T + 0.018203 * T**3) * arcsec
+        theta = (2004.3109 * T - 0.42665 * T*T - 0.041833 * T**3) * arcsec
+        cz,sz = np.cos(zeta),np.sin(zeta)
+        cZ,sZ = np.cos(z),np.sin(z)
+        ct,st = np.cos(theta),np.sin(theta)
+        P = np.array([[cZ*ct*cz - sZ*sz,-cZ*ct*sz - sZ*cz,-cZ*st],
+                      [sZ*ct*cz + cZ*sz,-sZ*ct*sz + cZ*cz,-sZ*st],
+                      [st*cz,-st*sz,ct]])
+        eq = np.einsum('ij...,...j->...i',P,eq)
+
+        # Local mean sidereal time
+        gmst = (280.46061837 + 360.98564736629 * d 
+                + 0.000387933 * T*T - T**3 / 38710000.) * units.deg
+        lst = gmst + lon
+        cl,sl = np.cos(lst),np.sin(lst)
+        cphi,sphi = np.cos(lat),np.sin(lat)
+
+        east = -sl * eq[...,0] + cl * eq[...,1]
+        north = (-sphi * (cl * eq[...,0] + sl * eq[...,1]) 
+                 + cphi * eq[...,2])
+        up = cphi * (cl * eq[...,0] + sl * eq[...,1]) + sphi * eq[...,2]
+        v_earth = np.stack((east,north,up),axis=-1)
+
+        # The lab frame is also traveling west due to Earth's rotation
+        v_rot = np.array([-self.earthSpeed,0,0])
+        return v_earth + v_rot
+
+    def validate_fast_lab(self,coord,year=2017,npoints=1000):
+        """
+        Compare earth_motion_lab_fast with the AstroPy calculation
+        at evenly spaced times over a year.
+
+        Args:
+            coord (list or array): The coordinates on Earth, of
+                the form [lat,lon]
+            year (int): The year to check
+            npoints (int): The number of times to check
+
+        Returns:
+            The maximum angle (radians) between the two lab 
+            frame velocities
+        """
+        start = dt.datetime(year,1,1,tzinfo=dt.timezone.utc).timestamp()
+        end = dt.datetime(year+1,1,1,tzinfo=dt.timezone.utc).timestamp()
+        t = np.linspace(start,end,npoints)
+        fast = self.fast_lab
+        try:
+            self.fast_lab = False
+            ref = self.earth_motion_lab(t,coord)
+        finally:
+            self.fast_lab = fast
+        v = self.earth_motion_lab_fast(t,coord)
+        cos = (np.sum(v*ref,axis=-1) 
+               / np.sqrt(np.sum(v*v,axis=-1) * np.sum(ref*ref,axis=-1)))
+        return np.max(np.arccos(np.clip(cos,-1,1)))
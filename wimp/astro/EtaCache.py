@@ -0,0 +1,128 @@
+""" EtaCache.py
+
+    Process-wide cache of tabulated mean inverse speeds,
+    eta(vmin), keyed by the halo parameters.
+
+"""
+__author__    = "Jeremy P. Lopez"
+__date__      = "June 2017"
+__copyright__ = "(c) 2017, Jeremy P. Lopez"
+
+from collections import OrderedDict
+import numpy as np
+
+class EtaTable:
+    """ eta(vmin) tabulated on a dense grid in vmin and
+        evaluated by linear interpolation.
+
+        The grid runs from 0 to vesc + |vE|, above which eta
+        is 0, and includes the kink at |vesc - |vE||.
+
+        Attributes:
+            vmin: The grid of minimum speeds
+            eta: eta(vmin) on the grid
+    """
+    def __init__(self,velocity,npoints=2048):
+        """ Tabulate eta(vmin) for a velocity distribution.
+
+            Args:
+                velocity (VelocityDist): Provides eta(vmin)
+                npoints (int): Number of grid points
+        """
+        vE_mag = np.sqrt(np.dot(velocity.vE,velocity.vE))
+        vmax = velocity.vesc + vE_mag
+        kink = abs(velocity.vesc - vE_mag)
+        self.vmin = np.unique(np.concatenate(
+                            (np.linspace(0,vmax,npoints),[kink])))
+        self.eta = np.asarray(velocity.eta(self.vmin),dtype=float)
+
+    def __call__(self,vmin):
+        """ Interpolate eta(vmin).
+
+            Args:
+                vmin (float or array): Minimum WIMP speed
+
+            Returns:
+                float or array: eta in units of inverse velocity
+        """
+        return np.interp(vmin,self.vmin,self.eta,right=0.)[()]
+
+
+class EtaCache:
+    """ Least recently used cache of EtaTable objects.
+
+        Tables are keyed by the velocity distribution class,
+        v0, vesc and |vE|, so every target and cross section
+        that share a halo model share a table. When more than
+        maxsize tables are stored, the least recently used one
+        is dropped.
+
+        Attributes:
+            maxsize (int): Maximum number of tables
+            npoints (int): Number of grid points for new tables
+            hits (int): Number of lookups using a stored table
+            misses (int): Number of tables built
+    """
+    def __init__(self,maxsize=256,npoints=2048):
+        """ Create an empty cache.
+
+            Args:
+                maxsize (int): Maximum number of tables
+                npoints (int): Number of grid points per table
+        """
+        self.maxsize = maxsize
+        self.npoints = npoints
+        self.hits = 0
+        self.misses = 0
+        self._tables = OrderedDict()
+
+    def __len__(self):
+        """ Number of stored tables. """
+        return len(self._tables)
+
+    def clear(self):
+        """ Remove all tables and reset the counters. """
+        self._tables.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def table(self,velocity):
+        """ Get the table for a velocity distribution, building
+            it if this set of parameters is new.
+
+            Args:
+                velocity (VelocityDist)
+
+            Returns:
+                EtaTable
+        """
+        vE_mag = float(np.sqrt(np.dot(velocity.vE,velocity.vE)))
+        key = (type(velocity),float(velocity.v0),
+               float(velocity.vesc),vE_mag)
+        tab = self._tables.get(key)
+        if tab is not None:
+            self.hits += 1
+            self._tables.move_to_end(key)
+            return tab
+
+        self.misses += 1
+        tab = EtaTable(velocity,self.npoints)
+        self._tables[key] = tab
+        while len(self._tables) > self.maxsize:
+            self._tables.popitem(last=False)
+        return tab
+
+    def eta(self,velocity,vmin):
+        """ Interpolated eta(vmin) for a velocity distribution.
+
+            Args:
+                velocity (VelocityDist)
+                vmin (float or array): Minimum WIMP speed
+
+            Returns:
+                float or array: eta in units of inverse velocity
+        """
+        return self.table(velocity)(vmin)
+
+
+eta_cache = EtaCache()
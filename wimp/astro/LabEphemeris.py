@@ -0,0 +1,136 @@
+""" LabEphemeris.py
+
+    Tabulated lab frame velocities for a fixed site,
+    interpolated in time.
+"""
+__author__    = "Jeremy P. Lopez"
+__date__      = "June 2017"
+__copyright__ = "(c) 2017, Jeremy P. Lopez"
+
+import numpy as np
+import scipy.interpolate
+from .Coordinates import Coordinates
+
+
+class LabEphemeris:
+    """
+    Lab frame velocity of a site, sampled once over a date range
+    with Coordinates.earth_motion_lab and then evaluated for any
+    time in the range with a cubic spline.
+
+    The velocity rotates once per sidereal day in the lab frame,
+    so the cadence has to resolve that. After the table is built,
+    the spline is checked against direct calculations at interval
+    midpoints and the largest deviation is stored in max_error.
+    With the default cadence of 30 minutes this is about
+    1e-3 km/s.
+
+    Attributes:
+        coord: Site coordinates [lat,lon]
+        t: Sample times (Unix seconds)
+        v: Lab frame velocities at the sample times (M,3)
+        cadence: Time between samples (seconds)
+        max_error: Largest interpolation error found in the
+                   midpoint check
+        coordinates: The Coordinates object used for the
+                     calculations and time conversions
+    """
+    def __init__(self,coord,start=None,end=None,cadence=1800.,
+                 coordinates=None,nvalidate=200):
+        """ Build the table.
+
+            Args:
+                coord: Site coordinates [lat,lon], e.g. from
+                       wimp.astro.locations
+                start: First time (datetime, datetime64 or Unix
+                       seconds). If None, the table is left
+                       empty, as used by load().
+                end: Last time
+                cadence (float): Time between samples in seconds
+                coordinates (Coordinates): Calculator to use.
+                       Defaults to a new Coordinates object.
+                nvalidate (int): Number of midpoints to check
+        """
+        if coordinates is None:
+            coordinates = Coordinates()
+        self.coordinates = coordinates
+        self.coord = np.asarray(coord,dtype=float)
+        self.cadence = cadence
+        self.max_error = 0
+        self.t = None
+        self.v = None
+        self._spline = None
+        if start is not None:
+            self.build(start,end,nvalidate)
+
+    def _unix(self,timestamp):
+        """ Convert timestamps to Unix seconds. """
+        days = np.asarray(self.coordinates.days_since_J2000(timestamp))
+        return days * 86400. + self.coordinates.J2000.timestamp()
+
+    def build(self,start,end,nvalidate=200):
+        """ Sample the velocity over a time range.
+
+            Args:
+                start: First time (datetime, datetime64 or Unix
+                       seconds)
+                end: Last time
+                nvalidate (int): Number of midpoints to check
+        """
+        t0 = float(self._unix(start))
+        t1 = float(self._unix(end))
+        n = max(int(np.ceil((t1 - t0) / self.cadence)),3) + 1
+        self.t = np.linspace(t0,t1,n)
+        self.v = self.coordinates.earth_motion_lab(self.t,self.coord)
+        self._spline = scipy.interpolate.CubicSpline(self.t,self.v,axis=0)
+
+        idx = np.unique(np.linspace(0,n-2,min(nvalidate,n-1)).astype(int))
+        tmid = 0.5 * (self.t[idx] + self.t[idx+1])
+        vmid = self.coordinates.earth_motion_lab(tmid,self.coord)
+        diff = self._spline(tmid) - vmid
+        self.max_error = np.max(np.sqrt(np.sum(diff*diff,axis=-1)))
+
+    def velocity(self,timestamp):
+        """ Interpolated lab frame velocity.
+
+            Args:
+                timestamp: A datetime, NumPy datetime64 value or
+                    array (UTC), or a float or array of Unix seconds
+
+            Returns:
+                NumPy array of length 3 for a single time, or of
+                shape (N,3) for N times
+        """
+        t = self._unix(timestamp)
+        if np.any(t < self.t[0]) or np.any(t > self.t[-1]):
+            raise ValueError('LabEphemeris: time outside of table range')
+        return self._spline(t)
+
+    def save(self,filename):
+        """ Save the table to a .npz file.
+
+            Args:
+                filename: The file name
+        """
+        np.savez(filename,t=self.t,v=self.v,coord=self.coord,
+                 cadence=self.cadence,max_error=self.max_error)
+
+    @classmethod
+    def load(cls,filename,coordinates=None):
+        """ Load a table saved with save().
+
+            Args:
+                filename: The file name
+                coordinates (Coordinates): Used for time conversions
+
+            Returns:
+                LabEphemeris
+        """
+        with np.load(filename) as f:
+            eph = cls(f['coord'],cadence=float(f['cadence']),
+                      coordinates=coordinates)
+            eph.t = f['t']
+            eph.v = f['v']
+            eph.max_error = float(f['max_error'])
+        eph._spline = scipy.interpolate.CubicSpline(eph.t,eph.v,axis=0)
+        return eph
@@ -22,17 +22,46 @@ class VelocityDist:
 
     def __init__(self):
         self._rand = np.random
-        self.v0 = 220 * units.km / units.sec
-        self.vesc = 550 * units.km / units.sec
+        self._v0 = 220 * units.km / units.sec
+        self._vesc = 550 * units.km / units.sec
         self.vE = 220 * units.km / units.sec * np.array([0,0,1])
-        self.norm = 1.0 / (np.pi * self.v0*self.v0)**1.5
-        self.needs_norm = True
+        self.normalize()
 
     def initialize(self):
         """ Do any initial calculations of parameters."""
         self.normalize()
 
 
+    @property
+    def v0(self):
+        """ The dispersion velocity. """
+        return self._v0
+
+    @v0.setter
+    def v0(self,v):
+        """ Set the dispersion velocity and renormalize.
+
+            Args:
+                v: The new velocity
+        """
+        self._v0 = v
+        self.normalize()
+
+    @property
+    def vesc(self):
+        """ The galactic escape velocity. """
+        return self._vesc
+
+    @vesc.setter
+    def vesc(self,v):
+        """ Set the galactic escape velocity and renormalize.
+
+            Args:
+                v: The new velocity
+        """
+        self._vesc = v
+        self.normalize()
+
     @property
     def random(self):
         """ The random number generator. """
@@ -58,39 +87,30 @@ class VelocityDist:
             'vesc' galactic escape velocity
 
         """
-        # renormalize:
-        renorm = False
+        # Setting v0 or vesc renormalizes
         if 'v0' in pars:
             self.v0 = pars['v0']
-            renorm = True
         if 'vE' in pars:
             self.vE = pars['vE']
         if 'vesc' in pars:
             self.vesc = pars['vesc'] 
-            renorm = True
-        if renorm:
-            self.normalize()
 
     def f(self,v):
         """
-        Calculate the probability density. Call normalize()
-        before calling this to get the proper normalization.
+        Calculate the probability density. The normalization
+        is kept up to date whenever v0 or vesc change.
          
         Args:
-            v (array(3)): WIMP velocity in lab frame
+            v (array(3) or array(N,3)): WIMP velocities in lab frame
 
         Returns: 
-            float: probability density
+            float or array(N): probability density
         """
-        if self.needs_norm:
-            self.needs_norm = False
-            self.normalize()
-
         v2 = v+self.vE
-        v2 = v2.dot(v2)
-        if v2 >= self.vesc*self.vesc:
-            return 0
-        return self.norm * np.exp( - v2 / (self.v0*self.v0))
+        v2 = np.sum(v2*v2,axis=-1)
+        return np.where(v2 < self.vesc*self.vesc,
+                        self.norm * np.exp( - v2 / (self.v0*self.v0)),
+                        0.)[()]
 
     def f_no_escape(self,v):
         """
@@ -98,18 +118,51 @@ class VelocityDist:
         function ignoring the escape velocity parameter
 
         Args:
-            v (array(3)): The WIMP velocity in the lab frame
+            v (array(3) or array(N,3)): WIMP velocities in lab frame
 
         Returns:
-            float: probability density
+            float or array(N): probability density
         """
-        if self.needs_norm:
-            self.needs_norm = False
-            self.normalize()
         v2 = v+self.vE
-        v2 = v2.dot(v2)
+        v2 = np.sum(v2*v2,axis=-1)
         return self.norm * np.exp( - v2 / (self.v0*self.v0))
 
+    def eta(self,vmin):
+        """
+        Calculates the mean inverse speed above vmin,
+        eta(vmin) = integral of f(v)/|v| over |v| > vmin,
+        using the closed form for the truncated Maxwellian
+        (e.g. Savage, Freese and Gondolo, Phys. Rev. D74 (2006)
+        043531; McCabe, Phys. Rev. D82 (2010) 023530).
+
+        The recoil spectrum is proportional to eta(vmin), where
+        vmin is the smallest speed able to produce the recoil.
+
+        Args:
+            vmin (float or array): Minimum WIMP speed in lab frame
+
+        Returns:
+            float or array: eta in units of inverse velocity
+        """
+        from scipy.special import erf
+
+        x = np.asarray(vmin,dtype=float) / self.v0
+        # The closed form has a 0/0 limit at vE = 0
+        y = max(np.sqrt(np.dot(self.vE,self.vE)) / self.v0,1e-6)
+        z = self.vesc / self.v0
+        Nesc = erf(z) - 2 * z / np.sqrt(np.pi) * np.exp(-z*z)
+        scale = 1. / (2 * Nesc * self.v0 * y)
+
+        if z >= y:
+            eta_low = scale * (erf(x+y) - erf(x-y)
+                               - 4 / np.sqrt(np.pi) * y * np.exp(-z*z))
+        else:
+            eta_low = 1. / (self.v0 * y) + 0*x
+        eta_mid = scale * (erf(z) - erf(x-y)
+                           - 2 / np.sqrt(np.pi) * (y+z-x) * np.exp(-z*z))
+
+        return np.where(x < np.abs(y-z),eta_low,
+                        np.where(x < y+z,eta_mid,0.))[()]
 
     def normalize(self):
         """
@@ -123,5 +176,3 @@ class VelocityDist:
         r = self.vesc / self.v0
         a = np.pi * self.v0**3 * (np.sqrt(np.pi)*erf(r) - 2*r*np.exp(-r*r) )
         self.norm = 1.0 / a
-        
-        self.needs_norm = False
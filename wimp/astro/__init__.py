@@ -1,4 +1,8 @@
 from .VelocityDist import VelocityDist
 from .AstroModel import AstroModel
 from .Coordinates import Coordinates
+from .LabEphemeris import LabEphemeris
+from .EtaCache import EtaCache
+from .EtaCache import eta_cache
 from . import locations
+from . import earth_orientation
@@ -0,0 +1,121 @@
+""" earth_orientation.py
+
+    Offline handling of the IERS Earth orientation data used by
+    AstroPy in the galactic to alt/az transforms.
+
+    By default AstroPy may try to download new IERS tables
+    during a transform, which stalls or fails on machines
+    without network access. use_offline() switches this off for
+    the whole process: downloads are disabled, a bundled or
+    local table is loaded once, and UT1-UTC values are
+    interpolated from it with a small memo so repeated
+    transforms of the same times skip the lookup.
+
+    Times outside the table use the value at the nearest edge
+    of the table. AstroPy handles polar motion according to
+    iers.conf.iers_degraded_accuracy.
+"""
+__author__    = "Jeremy P. Lopez"
+__date__      = "June 2017"
+__copyright__ = "(c) 2017, Jeremy P. Lopez"
+
+from collections import OrderedDict
+import numpy as np
+import astropy.time as astime
+import astropy.utils.data
+from astropy.utils import iers
+
+# True once use_offline() has been called
+offline = False
+# Maximum number of memoized UT1-UTC arrays
+cache_size = 64
+
+_table = None
+_table_path = None
+_cache = OrderedDict()
+
+
+def load_table(path=None,fmt='A'):
+    """ Load an IERS table once per process.
+
+        Args:
+            path: A local IERS file. If None, use the table
+                  bundled with AstroPy (IERS-B).
+            fmt: 'A' for finals2000A style files or 'B' for
+                 EOP C04 files
+
+        Returns:
+            The IERS table
+    """
+    global _table,_table_path
+    if _table is None or path != _table_path:
+        if path is None:
+            _table = iers.IERS_B.open()
+        elif fmt == 'B':
+            _table = iers.IERS_B.open(path)
+        else:
+            _table = iers.IERS_A.open(path)
+        _table_path = path
+        _cache.clear()
+    return _table
+
+def use_offline(path=None,fmt='A',degraded='warn'):
+    """ Switch the process to offline IERS handling.
+
+        Args:
+            path: A local IERS file, or None for the bundled table
+            fmt: 'A' or 'B', the format of the local file
+            degraded: AstroPy behavior for times outside the
+                      table ('error', 'warn' or 'ignore')
+
+        Returns:
+            The IERS table in use
+    """
+    global offline
+    iers.conf.auto_download = False
+    iers.conf.iers_degraded_accuracy = degraded
+    # Anything that still tries the network fails at once
+    astropy.utils.data.conf.allow_internet = False
+    table = load_table(path,fmt)
+    iers.earth_orientation_table.set(table)
+    offline = True
+    return table
+
+def ut1_utc(time):
+    """ UT1-UTC for an AstroPy Time, from the loaded table.
+
+        Args:
+            time: AstroPy Time (scalar or array)
+
+        Returns:
+            UT1-UTC (AstroPy Quantity, same shape as time)
+    """
+    table = load_table(_table_path)
+    mjd = np.asarray(time.utc.mjd,dtype=float)
+    key = (mjd.shape,mjd.tobytes())
+    value = _cache.get(key)
+    if value is not None:
+        _cache.move_to_end(key)
+        return value
+
+    mjd_table = table['MJD'].value
+    clipped = np.clip(mjd,mjd_table[0],mjd_table[-1])
+    value = table.ut1_utc(astime.Time(clipped,format='mjd',scale='utc'))
+    _cache[key] = value
+    while len(_cache) > cache_size:
+        _cache.popitem(last=False)
+    return value
+
+def prepare_time(time):
+    """ Attach UT1-UTC to a Time when in offline mode, so
+        transforms do not look it up again.
+
+        Args:
+            time: AstroPy Time
+
+        Returns:
+            The same Time object
+    """
+    if offline:
+        time.delta_ut1_utc = ut1_utc(time)
+    return time
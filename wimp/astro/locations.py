@@ -67,4 +67,37 @@ Canfranc = np.array([42.749174,-0.516586]) # From Google Maps
 # Rural Sichuan
 CJPL = np.array([28.15323,101.7114])
 
+# All of the locations above, in the order they are defined
+sites = {
+    'NewYork':NewYork,
+    'Cambridge':Cambridge,
+    'Fermilab':Fermilab,
+    'SLAC':SLAC,
+    'Brookhaven':Brookhaven,
+    'LosAlamos':LosAlamos,
+    'OakRidge':OakRidge,
+    'CERN':CERN,
+    'KEK':KEK,
+    'JINR':JINR,
+    'TRIUMF':TRIUMF,
+    'DESY':DESY,
+    'SNOLAB':SNOLAB,
+    'SURF':SURF,
+    'Kamioka':Kamioka,
+    'WIPP':WIPP,
+    'Boulby':Boulby,
+    'GranSasso':GranSasso,
+    'Canfranc':Canfranc,
+    'CJPL':CJPL,
+}
 
+
+def all_sites():
+    """ All of the locations in the sites registry.
+
+        Returns:
+            A list of the names and an (S,2) array of [lat,lon],
+            in the order they are defined
+    """
+    names = list(sites)
+    return names,np.array([sites[k] for k in names])
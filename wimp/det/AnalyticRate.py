@@ -0,0 +1,293 @@
+""" AnalyticRate.py
+
+    Deterministic event rate calculations for the standard
+    halo model using the mean inverse speed eta(vmin).
+
+"""
+__author__    = "Jeremy P. Lopez"
+__date__      = "June 2017"
+__copyright__ = "(c) 2017, Jeremy P. Lopez"
+
+from ..xsec.CrossSection import CrossSection
+from ..mc.sample import SampleBatch
+from ..astro.EtaCache import eta_cache
+from .. import units
+import numpy as np
+
+class AnalyticRate:
+    """ Calculates recoil spectra and rates by 1D quadrature
+        instead of Monte Carlo throws.
+
+        The differential rate for elastic scattering is
+        dR/dEr = xs * rho/Mx * Mtot/Mt * Mt/(2 mu^2)
+                 * F^2(Q^2) * eta(vmin),
+        with the same normalization as the weighted samplers.
+        Integrals are done with Gauss-Legendre quadrature,
+        split at the kinks of eta(vmin) and at the analysis
+        energy bounds, so the results have no statistical
+        noise.
+
+        Only efficiencies that depend on the recoil energy
+        alone (Efficiency.is_energy_only()) are supported, since
+        the quadrature has no recoil or WIMP directions. The
+        response has to define prob_in_range() consistently with
+        its throws (Response.has_prob_in_range()).
+
+        Attributes:
+            astro_model (AstroModel)
+            interaction (InteractionModel)
+            detector_model (DetectorModel)
+            nodes (int): Number of quadrature nodes per segment
+            use_eta_cache (bool): Interpolate eta(vmin) from the
+                                  shared table cache instead of
+                                  evaluating it directly
+            vE_mag: Earth speed
+            v0: Dispersion velocity
+            vesc: Galactic escape velocity
+            Mx: Dark matter mass
+            Mt: Target nucleus mass
+            xs: WIMP-nucleus cross section
+            mu: Interaction reduced mass
+            Mtot: Total detector mass
+            rho: WIMP mass density
+            Er_max: Largest possible recoil energy
+    """
+    def __init__(self,astro_model,int_model,detector_model):
+        """ Initialize the object.
+
+            Args:
+                astro_model (AstroModel)
+                int_model (InteractionModel)
+                detector_model (DetectorModel)
+        """
+        self.astro_model = astro_model
+        self.interaction = int_model
+        self.detector_model = detector_model
+        self.nodes = 64
+        self.use_eta_cache = False
+
+    def set_params(self,pars):
+        """ Set the parameters based on a dictionary.
+
+            Args:
+                pars {string}
+
+            Parameters:
+                ARNodes: Number of quadrature nodes per segment
+                AREtaCache: Use the shared eta(vmin) table cache
+        """
+        if 'ARNodes' in pars:
+            self.nodes = pars['ARNodes']
+        if 'AREtaCache' in pars:
+            self.use_eta_cache = pars['AREtaCache']
+
+    def initialize(self):
+        """ Copy the model parameters. Must be called
+            after any of the models change.
+        """
+        if (type(self.interaction.cross_section).MaxEr
+                is not CrossSection.MaxEr):
+            raise NotImplementedError('AnalyticRate only supports '
+                                      'elastic scattering')
+        if not self.detector_model.efficiency.is_energy_only():
+            raise NotImplementedError('AnalyticRate only supports '
+                                      'efficiencies that depend on the '
+                                      'recoil energy alone')
+        if not self.detector_model.response.has_prob_in_range():
+            raise NotImplementedError(
+                type(self.detector_model.response).__name__
+                + ' overrides its throws without prob_in_range()')
+        vE = self.astro_model.vE
+        self.vE_mag = np.sqrt(np.dot(vE,vE))
+        self.v0 = self.astro_model.v0
+        self.vesc = self.astro_model.vesc
+        self.Mx = self.interaction.Mx
+        self.Mt = self.interaction.Mt
+        self.xs = self.interaction.total_xs
+        self.mu = self.Mx*self.Mt / (self.Mx+self.Mt)
+        self.Mtot = self.interaction.Mtot
+        self.rho = self.astro_model.wimp_density
+        self.Er_max = self.vmin_to_Er(self.vesc + self.vE_mag)
+        self._x,self._w = np.polynomial.legendre.leggauss(self.nodes)
+
+    def vmin(self,Er):
+        """ Minimum WIMP speed to produce a recoil.
+
+            Args:
+                Er: Recoil energy (float or array)
+
+            Returns:
+                The minimum lab frame speed
+        """
+        Er = np.asarray(Er,dtype=float)
+        return (units.speed_of_light
+                * np.sqrt(self.Mt * Er / (2 * self.mu * self.mu)))[()]
+
+    def vmin_to_Er(self,v):
+        """ Largest recoil energy for a given WIMP speed.
+
+            Args:
+                v: WIMP lab frame speed (float or array)
+
+            Returns:
+                The recoil energy
+        """
+        v = np.asarray(v,dtype=float) / units.speed_of_light
+        return (2 * self.mu * self.mu * v * v / self.Mt)[()]
+
+    def dRdEr(self,Er):
+        """ Differential rate with respect to the true recoil
+            energy, before any detector effects.
+
+            Args:
+                Er: Recoil energy (float or array)
+
+            Returns:
+                dR/dEr (rate per unit time per unit energy)
+        """
+        Er = np.asarray(Er,dtype=float)
+        if self.use_eta_cache:
+            eta = eta_cache.eta(self.astro_model.velocity,self.vmin(Er))
+        else:
+            eta = self.astro_model.velocity.eta(self.vmin(Er))
+        ff2 = self.interaction.form_factor.ff2(2 * self.Mt * Er)
+        norm = (self.xs * self.rho / self.Mx * self.Mtot
+                * units.speed_of_light**2 / (2 * self.mu * self.mu))
+        return (norm * ff2 * eta)[()]
+
+    def efficiency(self,Er):
+        """ Detector efficiency at the given true energies.
+            The batch passed to the efficiency has zero
+            direction vectors, which is why initialize()
+            requires an energy-only efficiency.
+
+            Args:
+                Er: Recoil energies (array)
+
+            Returns:
+                Array of efficiencies
+        """
+        Er = np.atleast_1d(np.asarray(Er,dtype=float))
+        n = Er.shape[0]
+        batch = SampleBatch(Er,np.zeros((n,3)),1.,np.zeros((n,3)))
+        return self.detector_model.efficiency.efficiency_batch(batch)
+
+    def _nodes(self,breaks):
+        """ Quadrature nodes and weights over the segments
+            between sorted, unique break points.
+
+            Args:
+                breaks: Segment boundaries
+
+            Returns:
+                Energies and quadrature weights (flattened)
+        """
+        breaks = np.unique(breaks)
+        lo = breaks[:-1,None]
+        hi = breaks[1:,None]
+        E = 0.5 * (hi + lo) + 0.5 * (hi - lo) * self._x
+        w = 0.5 * (hi - lo) * self._w
+        return E.ravel(),w.ravel()
+
+    def _breaks(self,Elo,Ehi):
+        """ Break points in [Elo,Ehi], including the kinks
+            of eta(vmin).
+        """
+        kinks = self.vmin_to_Er(np.array([abs(self.vesc-self.vE_mag),
+                                          self.vesc+self.vE_mag]))
+        kinks = kinks[(kinks > Elo) & (kinks < Ehi)]
+        return np.concatenate(([Elo],kinks,[Ehi]))
+
+    def rate(self,Elo,Ehi):
+        """ Integrated true rate between two recoil energies.
+
+            Args:
+                Elo: Minimum energy
+                Ehi: Maximum energy
+
+            Returns:
+                The rate (per unit time)
+        """
+        Ehi = min(Ehi,self.Er_max)
+        if Ehi <= Elo:
+            return 0.
+        E,w = self._nodes(self._breaks(Elo,Ehi))
+        return np.sum(w * self.dRdEr(E))
+
+    def rates(self,Emin,Emax):
+        """ Total, true, and measured rates.
+
+            Args:
+                Emin: Minimum energy in analysis
+                Emax: Maximum energy in analysis
+
+            Returns:
+                A dictionary with keys Total, Truth and Meas,
+                as rates per unit time
+        """
+        total = self.rate(0,self.Er_max)
+        truth = self.rate(max(Emin,0),Emax)
+
+        E,w = self._nodes(self._meas_breaks([Emin,Emax]))
+        prob = self.detector_model.response.prob_in_range(E,Emin,Emax)
+        meas = np.sum(w * self.dRdEr(E) * self.efficiency(E) * prob)
+
+        return {'Total':total,
+                'Truth':truth,
+                'Meas':meas}
+
+    def _meas_breaks(self,E):
+        """ Break points for measured rates with reconstructed
+            bounds E: the kinks of eta(vmin) and any true energies
+            where the response steps at those bounds.
+        """
+        breaks = self._breaks(0,self.Er_max)
+        steps = self.detector_model.response.step_energies(
+                    np.asarray(E,dtype=float).reshape(-1))
+        if steps is None:
+            return breaks
+        steps = steps[(steps > 0) & (steps < self.Er_max)]
+        return np.unique(np.concatenate((breaks,steps)))
+
+    def cumulative_meas(self,E,Emin=0,chunk=1024):
+        """ Measured rates in [Emin,E) for an array of upper
+            energies, including efficiency and response.
+
+            If the response steps in the true energy, each
+            segment between steps is integrated once and the
+            rates are cumulative sums over the segments. Otherwise
+            the response is evaluated at a fixed set of nodes for
+            chunks of E at a time.
+
+            Args:
+                E: Upper reconstructed energies (float or array)
+                Emin: Minimum reconstructed energy
+                chunk: Number of energies handled together for
+                       smooth responses
+
+            Returns:
+                The rates (per unit time, same shape as E)
+        """
+        response = self.detector_model.response
+        E = np.asarray(E,dtype=float)
+        Eflat = E.reshape(-1)
+        breaks = self._meas_breaks(np.concatenate(([Emin],Eflat)))
+        Er,w = self._nodes(breaks)
+        spec = w * self.dRdEr(Er) * self.efficiency(Er)
+
+        steps = response.step_energies(Eflat)
+        if steps is not None:
+            # The response is constant within each segment, so the
+            # segments below the step for each E are summed
+            spec = spec * response.prob_in_range(Er,Emin,np.inf)
+            total = np.concatenate(([0],np.cumsum(
+                        spec.reshape(-1,self.nodes).sum(axis=1))))
+            i = np.clip(np.searchsorted(breaks,steps),0,total.size - 1)
+            return total[i].reshape(E.shape)[()]
+
+        result = np.empty(Eflat.shape)
+        for i in range(0,Eflat.size,chunk):
+            prob = response.prob_in_range(Er[np.newaxis,:],Emin,
+                                          Eflat[i:i+chunk,np.newaxis])
+            result[i:i+chunk] = prob.dot(spec)
+        return result.reshape(E.shape)[()]
@@ -90,6 +90,20 @@ class DetectorModel:
         sample.det_weight = self.efficiency.efficiency(sample) * sample.det_weight
         return self.response.weighted_throw(sample)
 
+    def weighted_throw_batch(self,samples):
+        """ Same as weighted_throw(), for a whole batch of
+            truth samples.
+
+            Args:
+                samples: (PyWIMPs SampleBatch)
+
+            Returns:
+                samples (PyWIMPs SampleBatch)
+        """
+        samples.det_weight = (self.efficiency.efficiency_batch(samples)
+                              * samples.det_weight)
+        return self.response.weighted_throw_batch(samples)
+
     def unweighted_throw(self,sample):
         """ Applies the detector response and efficiency to
             a truth sample.
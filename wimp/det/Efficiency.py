@@ -18,8 +18,15 @@ class Efficiency:
 
         Attributes:
             eff: The efficiency
+            energy_only: True if the efficiency only depends on
+                         the recoil energy. Class attribute. A
+                         subclass that overrides efficiency() or
+                         efficiency_batch() is treated as using
+                         more than the energy unless it sets
+                         energy_only = True itself.
 
     """
+    energy_only = True
     def __init__(self):
         """ Initializes to 100% efficiency and default numpy 
             randomization
@@ -71,6 +78,36 @@ class Efficiency:
         """
         return self.eff
 
+    def efficiency_batch(self,samples):
+        """ Get the efficiencies for a batch of events.
+
+            Subclasses should override this with a vectorized
+            version. Otherwise, efficiency() is called for each
+            event of the batch.
+
+            Args:
+                samples: (PyWIMPs SampleBatch)
+
+            Returns: array of efficiencies
+        """
+        if type(self).efficiency is Efficiency.efficiency:
+            return np.full(len(samples),self.eff,dtype=float)
+        return np.array([self.efficiency(s) for s in samples],dtype=float)
+
+    def is_energy_only(self):
+        """ Whether the efficiency only depends on the recoil
+            energy. The class that defines the efficiency methods
+            in use, or a subclass of it, has to set energy_only.
+
+            Returns: bool
+        """
+        for cls in type(self).__mro__:
+            if 'energy_only' in vars(cls):
+                return bool(vars(cls)['energy_only'])
+            if 'efficiency' in vars(cls) or 'efficiency_batch' in vars(cls):
+                return False
+        return False
+
 class LogisticEfficiency(Efficiency):
     """ Calculate the efficiency given a logistic model in recoil
         energy.
@@ -80,6 +117,7 @@ class LogisticEfficiency(Efficiency):
             x0: (double) - the energy offset
             xscale: (double) - the energy scale
     """
+    energy_only = True
     def __init__(self):
         """ Set some initial values"""
         self.eff = 1
@@ -116,4 +154,15 @@ class LogisticEfficiency(Efficiency):
         """
 
         return self.eff/(1 +np.exp(-(sample.Er - self.x0)/self.xscale ) )
+
+    def efficiency_batch(self,samples):
+        """ Get the efficiencies using a logistic model for a
+            batch of events
+
+            Args:
+                samples: (PyWIMPs SampleBatch)
+
+            Returns: array of efficiencies
+        """
+        return self.efficiency(samples)
     
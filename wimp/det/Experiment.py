@@ -11,6 +11,7 @@ __author__    = "Jeremy P. Lopez"
 __date__      = "June 2017"
 __copyright__ = "(c) 2017, Jeremy P. Lopez"
 from .DetectorModel import DetectorModel
+from .AnalyticRate import AnalyticRate
 from ..astro.AstroModel import AstroModel
 from ..xsec.InteractionModel import InteractionModel
 from ..mc.MaxwellWeightedSampler import MaxwellWeightedSampler
@@ -29,10 +30,20 @@ class Experiment:
         Attributes:
             rate_sampler: A sampling class
             event_sampler: An unweighted sampling class
+            rate_calculator: Analytic rate calculator
+            rate_method: 'MC' to calculate rates with the 
+                         rate sampler or 'Analytic' to use
+                         the rate calculator. The rate
+                         calculator is initialized when the
+                         analytic rates are calculated, so
+                         models it does not support only
+                         fail then.
             exposure: Total run time
             Emin: Minimum energy to consider in rates and samples
             Emax: Maximum energy to consider in rates and samples
             Nsamples: Number of samples to use in rate calculations
+            chunk_size: Number of samples processed together in
+                        rate calculations
             nrec_meas: Number of measured events in a dataset
             nrec_true: Number of true events in a dataset
             nrec_total: Number of true events in a dataset,   
@@ -55,11 +66,16 @@ class Experiment:
                                      self.interaction)
 
         self._detector_model = DetectorModel()
+        self.rate_calculator = AnalyticRate(self.astro_model,
+                                            self.interaction,
+                                            self.detector_model)
+        self.rate_method = 'MC'
 
         self.exposure = 300. * units.day
         self.Emin = 0
         self.Emax = 100 * units.keV
         self.Nsamples = 100000
+        self.chunk_size = 100000
         self.nrec_meas = 0
         self.nrec_true = 0
         self.nrec_total = 0
@@ -79,6 +95,8 @@ class Experiment:
                 ExpEmin: Minimum energy in analysis
                 ExpEmax: Maximum energy in analysis
                 ExpNSamples: Number of samples
+                ExpChunkSize: Number of samples per chunk
+                ExpRateMethod: 'MC' or 'Analytic'
 
         """
         if 'Exposure' in pars:
@@ -89,11 +107,16 @@ class Experiment:
             self.Emax = pars['ExpEmax']
         if 'ExpNSamples' in pars:
             self.Nsamples = pars['ExpNSamples']
+        if 'ExpChunkSize' in pars:
+            self.chunk_size = pars['ExpChunkSize']
+        if 'ExpRateMethod' in pars:
+            self.rate_method = pars['ExpRateMethod']
         self.detector_model.set_params(pars)
         self.astro_model.set_params(pars)
         self.interaction.set_params(pars)
         self.rate_sampler.set_params(pars)
         self.event_sampler.set_params(pars)
+        self.rate_calculator.set_params(pars)
 
     def initialize(self):
         """ Do any initial calculations of parameters."""
@@ -137,6 +160,7 @@ class Experiment:
         self._astro_model = am 
         self.rate_sampler.astro_model = am
         self.event_sampler.astro_model = am
+        self.rate_calculator.astro_model = am
 
     @property
     def interaction(self):
@@ -153,6 +177,7 @@ class Experiment:
         self._interaction = im
         self.rate_sampler.interaction = im
         self.event_sampler.interaction = im
+        self.rate_calculator.interaction = im
 
     @property
     def detector_model(self):
@@ -167,6 +192,7 @@ class Experiment:
                 det (DetectorModel)
         """
         self._detector_model = det
+        self.rate_calculator.detector_model = det
 
     
     def initialize(self):
@@ -180,6 +206,15 @@ class Experiment:
             experimental bounds) rates from some number
             of throws of the rate sampler.
 
+            Throws are done in chunks of chunk_size with the
+            batched sampler and detector calls. Only running 
+            sums of the weights and squared weights are kept, 
+            so memory use does not grow with N.
+
+            If rate_method is 'Analytic', the rates are
+            instead calculated by quadrature with the rate
+            calculator. N is ignored and the errors are 0.
+
             Args:
                 N (int): the number of throws. If 
                     not positive, use self.Nsamples
@@ -198,20 +233,26 @@ class Experiment:
         self.nrec_total_err = 0
         self.nrec_true_err = 0
         self.nrec_meas_err = 0
+        if self.rate_method == 'Analytic':
+            return self._analytic_rates()
         if N <= 0: 
             N = self.Nsamples
 
-        for i in range(N):
-            s = self.rate_sampler.sample()
-            self.nrec_total += s.gen_weight
-            self.nrec_total_err += s.gen_weight**2
-            if self.Emin <= s.Er < self.Emax:
-                self.nrec_true += s.gen_weight
-                self.nrec_true_err += s.gen_weight**2 
-            s = self.detector_model.weighted_throw(s)
-            if self.Emin <= s.Er_reco < self.Emax:
-                self.nrec_meas += s.weight 
-                self.nrec_meas_err += s.weight**2
+        nleft = N
+        while nleft > 0:
+            n = min(nleft,self.chunk_size)
+            nleft -= n
+            s = self.rate_sampler.sample_batch(n)
+            w = s.gen_weight
+            self.nrec_total += np.sum(w)
+            self.nrec_total_err += np.sum(w*w)
+            w = w[(self.Emin <= s.Er) & (s.Er < self.Emax)]
+            self.nrec_true += np.sum(w)
+            self.nrec_true_err += np.sum(w*w)
+            s = self.detector_model.weighted_throw_batch(s)
+            w = s.weight[(self.Emin <= s.Er_reco) & (s.Er_reco < self.Emax)]
+            self.nrec_meas += np.sum(w)
+            self.nrec_meas_err += np.sum(w*w)
 
         #print("Integral: ",self.nrec_total)      
         self.nrec_total *= self.exposure / N
@@ -223,6 +264,25 @@ class Experiment:
         self.nrec_meas_err = self.exposure * np.sqrt(self.nrec_meas_err) /N
  
 
+        return {'Total':self.nrec_total,
+                'TotalErr':self.nrec_total_err,
+                'Truth':self.nrec_true,
+                'TruthErr':self.nrec_true_err,
+                'Meas':self.nrec_meas,
+                'MeasErr':self.nrec_meas_err}
+
+    def _analytic_rates(self):
+        """ Get the rates from the analytic rate calculator.
+
+            Returns:
+                The same dictionary as event_rates()
+        """
+        self.rate_calculator.initialize()
+        rates = self.rate_calculator.rates(self.Emin,self.Emax)
+        self.nrec_total = rates['Total'] * self.exposure
+        self.nrec_true = rates['Truth'] * self.exposure
+        self.nrec_meas = rates['Meas'] * self.exposure
+
         return {'Total':self.nrec_total,
                 'TotalErr':self.nrec_total_err,
                 'Truth':self.nrec_true,
@@ -10,6 +10,7 @@ __copyright__ = "(c) 2017, Jeremy P. Lopez"
 
 
 import numpy as np
+import scipy.special
 from ..mc.sample import Sample
 
 class Response:
@@ -77,6 +78,79 @@ class Response:
         """
         return sample
 
+    def weighted_throw_batch(self,samples):
+        """ Same as weighted_throw(), for a whole batch of
+            events.
+
+            Subclasses should override this with a vectorized
+            version. Otherwise, weighted_throw() is called on a
+            view of each event, which must modify it in place.
+
+            Args:
+                samples (PyWIMPs SampleBatch)
+
+            Returns:
+                samples with detector response added
+        """
+        if type(self).weighted_throw is not Response.weighted_throw:
+            for s in samples:
+                self.weighted_throw(s)
+        return samples
+
+    def prob_in_range(self,Er,Emin,Emax):
+        """ Probability that the reconstructed energy falls in
+            [Emin,Emax) given the true recoil energy. Used for
+            analytic rate calculations.
+
+            Subclasses that change the reconstructed energy
+            must override this.
+
+            Args:
+                Er: True recoil energies (float or array)
+                Emin: Minimum reconstructed energy
+                Emax: Maximum reconstructed energy
+
+            Returns:
+                The probabilities (same shape as Er)
+        """
+        if type(self).weighted_throw is not Response.weighted_throw:
+            raise NotImplementedError(type(self).__name__
+                                      + '.prob_in_range() is not defined')
+        Er = np.asarray(Er,dtype=float)
+        return ((Emin <= Er) & (Er < Emax)).astype(float)[()]
+
+    def step_energies(self,E):
+        """ True energies at which prob_in_range() steps when
+            E is one of the reconstructed bounds. Analytic rates
+            split their integrals there.
+
+            Args:
+                E: Reconstructed energies (array)
+
+            Returns:
+                The true energies, or None if prob_in_range()
+                is smooth in the true energy
+        """
+        if type(self).prob_in_range is not Response.prob_in_range:
+            return None
+        return np.asarray(E,dtype=float)
+
+    def has_prob_in_range(self):
+        """ Whether prob_in_range() describes the throws. This is
+            the case if the class that defines the weighted throws
+            in use, or a subclass of it, also defines
+            prob_in_range().
+
+            Returns: bool
+        """
+        for cls in type(self).__mro__:
+            if 'prob_in_range' in vars(cls):
+                return True
+            if ('weighted_throw' in vars(cls)
+                    or 'weighted_throw_batch' in vars(cls)):
+                return False
+        return False
+
 
 class GaussianResponse(Response):
     """ The reconstructed energy follows a Gaussian distribution 
@@ -121,6 +195,43 @@ class GaussianResponse(Response):
         s.Er_reco = self._rand.normal(s.Er * self.mean,self.sigma * s.Er)
         return s
 
+    def prob_in_range(self,Er,Emin,Emax):
+        """ Probability that the reconstructed energy falls in
+            [Emin,Emax) given the true recoil energy.
+
+            Args:
+                Er: True recoil energies (float or array)
+                Emin: Minimum reconstructed energy
+                Emax: Maximum reconstructed energy
+
+            Returns:
+                The probabilities (same shape as Er)
+        """
+        Er = np.asarray(Er,dtype=float)
+        mean = Er * self.mean
+        width = self.sigma * Er
+        # A zero width leaves the energy unchanged
+        safe = np.where(width > 0,width,1.)
+        prob = (scipy.special.ndtr((Emax - mean)/safe)
+                - scipy.special.ndtr((Emin - mean)/safe))
+        return np.where(width > 0,prob,
+                        (Emin <= mean) & (mean < Emax))[()]
+
+    def step_energies(self,E):
+        """ True energies at which prob_in_range() steps. With
+            a zero width, that is E / mean.
+
+            Args:
+                E: Reconstructed energies (array)
+
+            Returns:
+                The true energies, or None for a non-zero width
+        """
+        if (self.sigma > 0 or type(self).prob_in_range
+                is not GaussianResponse.prob_in_range):
+            return None
+        return np.asarray(E,dtype=float) / self.mean
+
     def weighted_throw(self,s):
         """ Perform random throw over the parameter space and
             return a sample with detector effects added. Here,
@@ -137,3 +248,17 @@ class GaussianResponse(Response):
         """
         s.Er_reco = self._rand.normal(s.Er * self.mean,self.sigma * s.Er)
         return s
+
+    def weighted_throw_batch(self,samples):
+        """ Same as weighted_throw(), for a whole batch of
+            events.
+
+            Args:
+                samples (PyWIMPs SampleBatch)
+
+            Returns:
+                samples with detector response added
+        """
+        samples.Er_reco = self._rand.normal(samples.Er * self.mean,
+                                            self.sigma * samples.Er)
+        return samples
@@ -4,3 +4,4 @@ from .Efficiency import Efficiency
 from .Efficiency import LogisticEfficiency
 from .DetectorModel import DetectorModel
 from .Experiment import Experiment
+from .AnalyticRate import AnalyticRate
@@ -0,0 +1,237 @@
+""" CmaxTable.py
+
+Monte Carlo tables for Yellin's optimum interval method.
+
+S. Yellin, Phys. Rev. D66 (2002) 032005.
+
+Event positions are measured as fractions of the cumulative
+expected signal spectrum, where a signal with mean mu is
+uniform. The tables hold C_n(x,mu), the probability that
+every interval with n or fewer events is smaller than x,
+and percentiles of Cmax = max_n C_n(x_n,mu) for signal-only
+experiments. They depend only on mu, so one table serves
+every spectrum.
+"""
+__author__ =    'Jeremy P. Lopez'
+__date__ =      'June, 2017'
+__copyright__ = '(c) 2017, Jeremy P. Lopez'
+
+import multiprocessing
+import numpy as np
+from ..xsec.ff_cache import savez_atomic
+
+
+def interval_sizes(u,n_max):
+    """ Largest intervals containing n events, for n = 0..n_max.
+
+        Args:
+            u: Sorted event fractions in [0,1], shape (T,N) for
+               T experiments with N events each
+            n_max: Largest number of events in an interval
+
+        Returns:
+            Interval sizes as fractions of the whole range,
+            shape (T,n_max+1). The size is 1 for n >= N.
+    """
+    u = np.atleast_2d(u)
+    T,N = u.shape
+    edges = np.concatenate((np.zeros((T,1)),u,np.ones((T,1))),axis=1)
+    x = np.ones((T,n_max+1))
+    for n in range(min(N,n_max+1)):
+        x[:,n] = np.max(edges[:,n+1:] - edges[:,:-(n+1)],axis=1)
+    return x
+
+def _toy_worker(args):
+    """ Pool worker for CmaxTable.build(). Runs the toys for
+        one mean.
+
+        Returns:
+            (C,cmax): C_n on the table grid, shape (n_max+1,K),
+                      and the Cmax percentiles
+    """
+    mu,n_max,ntoys,t,cl,seed = args
+    rand = np.random.RandomState(seed)
+    N = rand.poisson(mu,ntoys)
+    x = np.empty((ntoys,n_max+1))
+    for n in np.unique(N):
+        sel = N == n
+        u = np.sort(rand.uniform(0,1,(np.sum(sel),n)),axis=1)
+        x[sel] = interval_sizes(u,n_max)
+
+    # C_n(x) = P(x_n < x) on the grid x = t^2
+    f = t * t
+    xs = np.sort(x,axis=0)
+    C = np.array([np.searchsorted(xs[:,n],f,side='left')
+                  for n in range(n_max+1)]) / ntoys
+
+    cn = _interp_grid(C[np.newaxis],np.zeros(ntoys,dtype=int),x,t.size)
+    valid = np.arange(n_max+1) <= N[:,np.newaxis]
+    cmax = np.max(np.where(valid,cn,0),axis=1)
+    return C,np.quantile(cmax,cl)
+
+def _interp_grid(C,j,x,K):
+    """ Linear interpolation of C_n tables in t = sqrt(x).
+
+        Args:
+            C: Tables, shape (M,n_max+1,K)
+            j: Table index for each experiment, shape (T,)
+            x: Interval sizes, shape (T,n_max+1)
+            K: Number of grid points
+
+        Returns:
+            C_n(x_n), shape (T,n_max+1)
+    """
+    s = np.sqrt(np.clip(x,0,1)) * (K - 1)
+    i = np.minimum(s.astype(int),K - 2)
+    w = s - i
+    n = np.arange(x.shape[1])
+    j = j[:,np.newaxis]
+    return (1 - w) * C[j,n,i] + w * C[j,n,i+1]
+
+
+class CmaxTable:
+    """ C_n and Cmax percentile tables on a grid of means.
+
+        C_n(x,mu) is stored on a grid uniform in sqrt(x), so
+        the small intervals seen at large mu are resolved. For
+        each mean, the same toys give the C_n tables and the
+        distribution of Cmax, which is stored at the confidence
+        levels in cl. Intervals are only considered up to n_max
+        events, for data and toys alike. Between grid points,
+        tables are interpolated linearly in log(mu) and CL.
+
+        Attributes:
+            mu: Grid of means
+            cl: Grid of confidence levels
+            n_max: Largest number of events in an interval
+            ntoys: Number of toy experiments per mean
+            t: Grid in sqrt(x)
+            C: C_n tables, shape (len(mu),n_max+1,len(t))
+            cmax: Cmax percentiles, shape (len(mu),len(cl))
+    """
+    def __init__(self,mu=None,cl=None,n_max=50,ntoys=20000,npoints=513,
+                 seed=None,processes=None):
+        """ Build a table, or an empty one if mu is None
+            (as used by load()).
+
+            Args:
+                mu: Grid of means
+                cl: Grid of confidence levels. Defaults to
+                    0.5 to 0.99 in steps of 0.01.
+                n_max: Largest number of events in an interval
+                ntoys: Number of toy experiments per mean
+                npoints: Number of grid points in sqrt(x)
+                seed: Seed for the toy experiments
+                processes: Number of worker processes. None uses
+                           all CPUs, 1 builds in this process.
+        """
+        if cl is None:
+            cl = np.linspace(0.5,0.99,50)
+        self.cl = np.asarray(cl,dtype=float)
+        self.n_max = n_max
+        self.ntoys = ntoys
+        self.t = np.linspace(0,1,npoints)
+        self.mu = None
+        self.C = None
+        self.cmax = None
+        if mu is not None:
+            self.build(mu,seed,processes)
+
+    def build(self,mu,seed=None,processes=None):
+        """ Run the toy experiments in parallel.
+
+            Args:
+                mu: Grid of means
+                seed: Seed for the toy experiments
+                processes: Number of worker processes
+        """
+        self.mu = np.unique(np.asarray(mu,dtype=float))
+        seeds = np.random.RandomState(seed).randint(2**31,size=self.mu.size)
+        tasks = [(m,self.n_max,self.ntoys,self.t,self.cl,s)
+                 for m,s in zip(self.mu,seeds)]
+
+        if processes == 1:
+            results = [_toy_worker(task) for task in tasks]
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(_toy_worker,tasks)
+
+        self.C = np.array([r[0] for r in results])
+        self.cmax = np.array([r[1] for r in results])
+
+    def _mu_index(self,mu):
+        """ Grid indices and weights for interpolation in log(mu). """
+        lmu = np.log(self.mu)
+        j = np.clip(np.searchsorted(lmu,np.log(mu)) - 1,0,self.mu.size - 2)
+        w = (np.log(mu) - lmu[j]) / (lmu[j+1] - lmu[j])
+        return j,np.clip(w,0,1)
+
+    def C_n(self,x,mu):
+        """ Probability that all intervals with n or fewer
+            events are smaller than x.
+
+            Args:
+                x: Interval sizes as fractions of mu,
+                   shape (T,n_max+1)
+                mu: Means, shape (T,)
+
+            Returns:
+                C_n(x_n,mu), shape (T,n_max+1)
+        """
+        j,w = self._mu_index(np.asarray(mu,dtype=float))
+        K = self.t.size
+        lo = _interp_grid(self.C,j,x,K)
+        hi = _interp_grid(self.C,j + 1,x,K)
+        return (1 - w[:,np.newaxis]) * lo + w[:,np.newaxis] * hi
+
+    def cmax_bar(self,cl,mu):
+        """ Percentile of Cmax for signal-only experiments.
+
+            Args:
+                cl: The confidence level
+                mu: Means (float or array)
+
+            Returns:
+                The value of Cmax that is exceeded with
+                probability 1-cl
+        """
+        if cl < self.cl[0] or cl > self.cl[-1]:
+            raise ValueError('CmaxTable: confidence level outside table range')
+        j,w = self._mu_index(np.asarray(mu,dtype=float))
+        table = np.array([np.interp(cl,self.cl,c) for c in self.cmax])
+        return ((1 - w) * table[j] + w * table[j+1])[()]
+
+    def save(self,filename):
+        """ Save the table to a .npz file. The file is written
+            to a temporary file first and moved into place, so
+            readers never see a partial table.
+
+            Args:
+                filename: The file name
+        """
+        savez_atomic(filename,compressed=True,mu=self.mu,cl=self.cl,
+                     t=self.t,n_max=self.n_max,ntoys=self.ntoys,
+                     counts=np.rint(self.C * self.ntoys).astype(np.int32),
+                     cmax=self.cmax)
+
+    @classmethod
+    def load(cls,filename):
+        """ Load a table saved with save().
+
+            Args:
+                filename: The file name
+
+            Returns:
+                CmaxTable
+        """
+        table = cls()
+        with np.load(filename) as f:
+            table.mu = f['mu']
+            table.cl = f['cl']
+            table.t = f['t']
+            table.n_max = int(f['n_max'])
+            table.ntoys = int(f['ntoys'])
+            # C_n are fractions of the toys, so they are stored exactly
+            table.C = f['counts'] / table.ntoys
+            table.cmax = f['cmax']
+        return table
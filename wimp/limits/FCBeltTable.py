@@ -0,0 +1,273 @@
+""" FCBeltTable.py
+
+Precomputed Feldman-Cousins confidence belts on a grid of
+signal means and background expectations.
+
+Intervals are then found by table lookup instead of 
+rebuilding the belt for every query.
+"""
+__author__ =    'Jeremy P. Lopez'
+__date__ =      'June, 2017'
+__copyright__ = '(c) 2017, Jeremy P. Lopez'
+
+import multiprocessing
+import numpy as np
+from .FeldmanCousinsLimit import _poisson_pmf, fc_belt, fc_interval
+
+
+def _belt_worker(args):
+    """ Pool worker for FCBeltTable.build(). """
+    b,mu,CL = args
+    return fc_belt(b,mu,CL)
+
+
+class FCBeltTable:
+    """ Table of Feldman-Cousins belts for one confidence level.
+
+        For every background value in b_grid, the accepted range
+        of counts [n1,n2] is stored for signal means on a grid
+        with spacing dmu. An interval for N counts is read off
+        as the range of all means whose belt contains N, widened
+        by one grid step on each side for the discretization.
+        The belt edges are not monotonic in the mean when there
+        is background, so the whole belt is searched. Between
+        background grid points the union of the intervals at the
+        two neighboring points is used. FC intervals can jump as
+        b changes, so the union is used instead of interpolating
+        the end points.
+
+        The discretization can still cause small coverage
+        shortfalls. build() checks the table against belts
+        computed directly at the midpoints of the background
+        grid. The largest distance by which a direct interval
+        extends beyond the table interval is stored in mu_error.
+        The coverage of the table intervals is also computed at
+        the grid points and the midpoints for means up to 80% of
+        the grid, and the largest shortfall below CL is stored in
+        coverage_error. validate() compares the table with
+        fc_interval.
+
+        Attributes:
+            CL: The confidence level
+            b_grid: Background values
+            mu: Signal mean grid
+            n1: Smallest accepted counts (len(b_grid),len(mu))
+            n2: Largest accepted counts (len(b_grid),len(mu))
+            mu_error: Largest under-coverage of the end points
+            coverage_error: Largest coverage shortfall below CL
+            Ncheck: Largest count used in the error check
+    """
+    def __init__(self,b_grid=None,CL=0.9,mu_max=50.,dmu=0.01,
+                 processes=None):
+        """ Build a table, or an empty one if b_grid is None
+            (as used by load()).
+
+            Args:
+                b_grid: Background values
+                CL: The confidence level
+                mu_max: Largest signal mean
+                dmu: Spacing of the signal mean grid
+                processes: Number of worker processes. None uses
+                           all CPUs, 1 builds in this process.
+        """
+        self.CL = CL
+        self.mu_error = 0
+        self.coverage_error = 0
+        self.Ncheck = 0
+        self.b_grid = None
+        self.mu = None
+        self.n1 = None
+        self.n2 = None
+        self._lo = None
+        self._hi = None
+        if b_grid is not None:
+            self.build(b_grid,mu_max,dmu,processes)
+
+    def build(self,b_grid,mu_max=50.,dmu=0.01,processes=None):
+        """ Compute the belts in parallel.
+
+            Args:
+                b_grid: Background values
+                mu_max: Largest signal mean
+                dmu: Spacing of the signal mean grid
+                processes: Number of worker processes
+        """
+        self.b_grid = np.unique(np.asarray(b_grid,dtype=float))
+        self.mu = np.arange(0,mu_max + 0.5*dmu,dmu)
+        b_mid = 0.5 * (self.b_grid[1:] + self.b_grid[:-1])
+        tasks = [(b,self.mu,self.CL)
+                 for b in np.concatenate((self.b_grid,b_mid))]
+
+        if processes == 1:
+            belts = [_belt_worker(t) for t in tasks]
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                belts = pool.map(_belt_worker,tasks)
+
+        nb = self.b_grid.size
+        self.n1 = np.array([belt[0] for belt in belts[:nb]])
+        self.n2 = np.array([belt[1] for belt in belts[:nb]])
+        self._lo = None
+        self._hi = None
+        self._check_error(b_mid,belts[nb:])
+
+    def _check_error(self,b_mid,belts):
+        """ Compare the table intervals with direct belts
+            at the background grid midpoints.
+
+            Args:
+                b_mid: Background midpoints
+                belts: (n1,n2) for each midpoint
+        """
+        dmu = self.mu[1] - self.mu[0]
+        # Counts whose intervals lie within the mu grid
+        self.Ncheck = int(self.n1[:,-1].min())
+        N = np.arange(self.Ncheck)
+        err = 0
+        for b,(n1,n2) in zip(b_mid,belts):
+            lo,hi = self._interval(N,b)
+            dlo,dhi = self._lookup(n1,n2,N)
+            # The direct intervals are widened by dmu as well
+            err = max(err,np.max(lo - dlo - dmu),np.max(dhi - hi - dmu))
+        self.mu_error = max(err,0)
+
+        # Coverage of the table intervals at the grid points and
+        # the midpoints. Only means well inside the grid are
+        # checked, so that large counts are not cut off.
+        N = np.arange(self.n2.max() + 1)
+        b_check = np.concatenate((self.b_grid,b_mid))
+        lo,hi = self._interval(N,b_check[:,np.newaxis])
+        mu = self.mu[self.mu <= 0.8 * self.mu[-1],np.newaxis]
+        deficit = 0
+        for b,lo_b,hi_b in zip(b_check,lo,hi):
+            covered = (lo_b <= mu) & (mu <= hi_b)
+            coverage = np.sum(_poisson_pmf(N,mu+b) * covered,axis=1)
+            deficit = max(deficit,np.max(self.CL - coverage))
+        self.coverage_error = max(deficit,0)
+
+    def _lookup(self,n1,n2,N):
+        """ Intervals from one belt.
+
+            Args:
+                n1,n2: The belt
+                N: Array of counts
+
+            Returns:
+                Lower and upper limits
+        """
+        dmu = self.mu[1] - self.mu[0]
+        N = np.asarray(N)
+        Nflat = N.reshape(-1,1)
+        inside = (n1 <= Nflat) & (Nflat <= n2)
+        # First and last means whose belt contains N. Counts not
+        # in any belt on the grid get the end of the grid.
+        last = self.mu.size - 1
+        ilo = np.where(inside.any(axis=1),np.argmax(inside,axis=1),last)
+        ihi = np.where(inside.any(axis=1),
+                       last - np.argmax(inside[:,::-1],axis=1),last)
+        lo = np.where(ilo > 0,self.mu[ilo] - dmu,0)
+        hi = np.minimum(self.mu[ihi] + dmu,self.mu[-1])
+        return lo.reshape(N.shape),hi.reshape(N.shape)
+
+    def interval(self,N,b):
+        """ Feldman-Cousins intervals from the table.
+
+            Args:
+                N: Number of measured events (int or array)
+                b: Expected number of backgrounds (float or array,
+                   within the table range)
+
+            Returns:
+                The lower and upper limits on the signal mean
+        """
+        N = np.asarray(N)
+        b = np.asarray(b,dtype=float)
+        if np.any(b < self.b_grid[0]) or np.any(b > self.b_grid[-1]):
+            raise ValueError('FCBeltTable: background outside table range')
+        if np.any(N >= self.n1[:,-1].min()):
+            print('FCBeltTable: Upper limits reach the end of the mu grid')
+        return self._interval(N,b)
+
+    def _interval(self,N,b):
+        """ Same as interval(), without the range checks. """
+        N,b = np.broadcast_arrays(N,b)
+
+        # Grid points on either side of b. A b on a grid point
+        # only uses that point.
+        j = np.clip(np.searchsorted(self.b_grid,b,side='right') - 1,
+                    0,self.b_grid.size-1)
+        jp = np.where(b > self.b_grid[j],
+                      np.minimum(j + 1,self.b_grid.size - 1),j)
+
+        if self._lo is None:
+            # Intervals for every count at every grid point
+            Nall = np.arange(self.n2.max() + 2)
+            intervals = [self._lookup(n1,n2,Nall)
+                         for n1,n2 in zip(self.n1,self.n2)]
+            self._lo = np.array([x[0] for x in intervals])
+            self._hi = np.array([x[1] for x in intervals])
+        N = np.minimum(N,self._lo.shape[1] - 1)
+        lo = np.minimum(self._lo[j,N],self._lo[jp,N])
+        hi = np.maximum(self._hi[j,N],self._hi[jp,N])
+        return lo[()],hi[()]
+
+    def validate(self,N=None,b=None):
+        """ Compare the table with fc_interval.
+
+            Args:
+                N: Counts to check. Defaults to all counts whose
+                   intervals lie within the mu grid.
+                b: Backgrounds to check. Defaults to the grid.
+
+            Returns:
+                The largest difference between the end points of
+                the table and fc_interval intervals
+        """
+        if N is None:
+            N = np.arange(self.Ncheck)
+        if b is None:
+            b = self.b_grid
+        err = 0
+        for bi in np.reshape(b,-1):
+            lo,hi = self.interval(N,bi)
+            direct = np.array([fc_interval(n,bi,self.CL)
+                               for n in np.reshape(N,-1)])
+            err = max(err,np.max(np.abs(lo - direct[:,0])),
+                      np.max(np.abs(hi - direct[:,1])))
+        return err
+
+    def save(self,filename):
+        """ Save the table to a .npz file.
+
+            Args:
+                filename: The file name
+        """
+        dtype = np.int16 if self.n2.max() < 2**15 else np.int32
+        np.savez_compressed(filename,CL=self.CL,b_grid=self.b_grid,
+                            mu=self.mu,n1=self.n1.astype(dtype),
+                            n2=self.n2.astype(dtype),
+                            mu_error=self.mu_error,
+                            coverage_error=self.coverage_error,
+                            Ncheck=self.Ncheck)
+
+    @classmethod
+    def load(cls,filename):
+        """ Load a table saved with save().
+
+            Args:
+                filename: The file name
+
+            Returns:
+                FCBeltTable
+        """
+        table = cls()
+        with np.load(filename) as f:
+            table.CL = float(f['CL'])
+            table.b_grid = f['b_grid']
+            table.mu = f['mu']
+            table.n1 = f['n1'].astype(int)
+            table.n2 = f['n2'].astype(int)
+            table.mu_error = float(f['mu_error'])
+            table.coverage_error = float(f['coverage_error'])
+            table.Ncheck = int(f['Ncheck'])
+        return table
@@ -129,11 +129,29 @@ class FeldmanCousinsLimit:
 
         return xs_min,xs_max
 
+def _poisson_pmf(n,mu):
+    """ Poisson probabilities for an array of counts.
+
+        Args:
+            n: Array of counts
+            mu: The mean, or an array of means that broadcasts
+                against n
+
+        Returns:
+            The probabilities
+    """
+    return np.exp(scipy.special.xlogy(n,mu) - mu
+                  - scipy.special.gammaln(n+1))
+
 def fc_limits(s,b=0,CL=0.9):
     """ Function to calculate bounds on the number of measured
         events for a model given the Feldman-Cousins ordering
         principle.
 
+        The probabilities and likelihood ratios for all counts
+        are evaluated at once, and the acceptance region is 
+        found from the cumulative sum over the ranked counts.
+
         Args:
             s: The expected number of signal events
             b: The expected number of background events
@@ -142,97 +160,147 @@ def fc_limits(s,b=0,CL=0.9):
         Returns:
             The CL bounds on the number of expected events
             in the experiment given a signal and background
-            model.
+            model, and the probability contained in them.
     """
     # Get approx. # of sigma:
     sigma = scipy.special.erfinv(CL) * np.sqrt(2)
-    N_max = int(max(s+b + 4*sigma * np.sqrt(s+b),20) )
+    mu = s + b
+    N_max = int(max(mu + 4*(sigma+1) * np.sqrt(mu),20))
     # Should be enough for a reasonable data set
     while True:
-        N_max = N_max * 2
-        ratio = np.zeros(N_max)
-        pval = np.zeros(N_max)
-        for n in range(N_max):
-            pval[n] = scipy.stats.poisson.pmf(n,s+b)
-            pbest = 1e4
-            if b > n:
-                pbest = scipy.stats.poisson.pmf(n,b)
-          
-                # minus sign is because sorting is in ascending order
-            else:
-                pbest = scipy.stats.poisson.pmf(n,n)
-            ratio[n] = -pval[n] / pbest  
-        sorted_indices = np.argsort(ratio)
-        total_prob = 0
-        lim_min = N_max
-        lim_max = -1
-        n = 0
-        while total_prob < CL and n < len(ratio):
-            total_prob += pval[sorted_indices[n]]
-            if sorted_indices[n] < lim_min:
-                lim_min = sorted_indices[n]
-            if sorted_indices[n] > lim_max:
-                lim_max = sorted_indices[n]
-            n = n+1
-    
+        n = np.arange(N_max)
+        pval = _poisson_pmf(n,mu)
+        # The best fit mean is max(n,b) since s >= 0
+        pbest = _poisson_pmf(n,np.maximum(n,b))
+        order = np.argsort(-pval / pbest,kind='stable')
+        total = np.cumsum(pval[order])
+        k = min(np.searchsorted(total,CL),N_max-1)
+        accepted = order[:k+1]
+        lim_min = accepted.min()
+        lim_max = accepted.max()
+
         if lim_max < N_max-1:
             break
-  
-    return lim_min,lim_max,total_prob
+        N_max = N_max * 2
+
+    return lim_min,lim_max,total[k]
+
+def fc_belt(b,mu,CL=0.9,chunk=1024):
+    """ Feldman-Cousins acceptance regions for many signal
+        means at once.
+
+        Args:
+            b: The expected number of background events
+            mu: Array of signal means
+            CL: The confidence level
+            chunk: Number of means handled together
+
+        Returns:
+            Arrays of the smallest and largest accepted counts
+            for each mean
+    """
+    mu = np.asarray(mu,dtype=float)
+    sigma = scipy.special.erfinv(CL) * np.sqrt(2)
+    mu_max = mu.max() + b
+    N_max = int(max(mu_max + 4*(sigma+1) * np.sqrt(mu_max),20))
+    n = np.arange(N_max)
+    pbest = _poisson_pmf(n,np.maximum(n,b))
+
+    n1 = np.empty(mu.shape,dtype=int)
+    n2 = np.empty(mu.shape,dtype=int)
+    for i in range(0,mu.size,chunk):
+        pval = _poisson_pmf(n,mu[i:i+chunk,np.newaxis] + b)
+        order = np.argsort(-pval / pbest,axis=1,kind='stable')
+        total = np.cumsum(np.take_along_axis(pval,order,axis=1),axis=1)
+        k = np.minimum(np.sum(total < CL,axis=1),N_max-1)
+        # Counts ranked after position k are not accepted
+        rank = np.arange(N_max)
+        accepted = np.where(rank <= k[:,np.newaxis],order,-1)
+        n2[i:i+chunk] = accepted.max(axis=1)
+        n1[i:i+chunk] = np.where(accepted >= 0,accepted,N_max).min(axis=1)
+    return n1,n2
+
+def _fc_edge(N,b,CL,lo,hi,tol,upper):
+    """ Find one end of a Feldman-Cousins interval on the grid
+        of means with spacing tol, scanning the belt near a
+        bracket from bisection.
+
+        Args:
+            N: Number of measured events
+            b: Expected number of backgrounds
+            CL: Confidence level
+            lo,hi: Bracket on the edge
+            tol: Grid spacing
+            upper: True for the upper limit
+
+        Returns:
+            The limit, rounded outwards to the next grid point
+    """
+    # The belt edges only step back over small ranges of the
+    # mean, so the scan is widened until the edge is inside it.
+    margin = 1.
+    while True:
+        i0 = max(int(np.floor((lo - margin) / tol)),0)
+        i1 = int(np.ceil((hi + margin) / tol)) + 1
+        s = tol * np.arange(i0,i1)
+        n1,n2 = fc_belt(b,s,CL)
+        inside = np.flatnonzero((n1 <= N) & (N <= n2))
+        if upper and inside.size > 0 and inside[-1] < s.size - 1:
+            return tol * (i0 + inside[-1] + 1)
+        if not upper and inside.size > 0 and (inside[0] > 0 or i0 == 0):
+            return tol * max(i0 + inside[0] - 1,0)
+        margin = 2 * margin
 
 def fc_interval(N_exp=0,b=0,CL=0.9):
     """ Function to calculate Feldman-Cousins confidence
         intervals.
 
+        With background, the edges of the acceptance regions
+        are not monotonic in the signal mean. Each end of the
+        interval is bracketed by bisection and then found by
+        evaluating the belt on a grid with spacing _tol around
+        the bracket. The limits are rounded outwards to the
+        grid.
+
         Args:
             N_exp: (int)  Number of measured events. Default: 0
             b: (float) Expected number of backgrounds. Default: 0
             CL: (float, 0-1) Confidence level. 
+
+        Returns:
+            The lower and upper limits on the signal mean
     """
-    low_limit = 0
     sigma = scipy.special.erfinv(CL) * np.sqrt(2)
     up_limit = int(max(N_exp+10*sigma*np.sqrt(N_exp),20))
 
-    lim_minl,lim_maxl,total_probl = fc_limits(low_limit,b,CL)
-
     lim_minu,lim_maxu,total_probu = fc_limits(up_limit,b,CL)
     while lim_minu <= N_exp:
         up_limit = 2 * up_limit
         lim_minu,lim_maxu,total_probu = \
                  fc_limits(up_limit,b,CL)
 
-    upper_lim = False
-    
-    if lim_minl <= N_exp < lim_maxl:
-        upper_lim = True # We want an interval in this case
-        print("Calculating upper limit")
-    # Binary search for the limit
-    if upper_lim == False:
-        low_l = low_limit
-        up_l = up_limit
-        
-        while up_l - low_l > FeldmanCousinsLimit._tol:
-            new_l = 0.5 * (up_l - low_l) + low_l
-            minl, maxl, total_prob = fc_limits(new_l,b,CL)
-            if maxl >= N_exp:
-                up_l = new_l
-            else:
-                low_l = new_l
-        low_limit = low_l
-
-    # Upper limit now
-
-    low_l = 0
-    up_l = up_limit
-    
-    while up_l - low_l > FeldmanCousinsLimit._tol:
-        new_l = 0.5 * (up_l - low_l) + low_l
-        minl, maxl, total_prob = fc_limits(new_l,Nb,CL)
-        if minl <= N_exp:
-            low_l = new_l
+    tol = FeldmanCousinsLimit._tol
+    # Bracket the upper limit, where the smallest accepted count
+    # passes N_exp
+    low_u,up_u = 0.,float(up_limit)
+    while up_u - low_u > 0.25:
+        new_l = 0.5 * (low_u + up_u)
+        if fc_limits(new_l,b,CL)[0] <= N_exp:
+            low_u = new_l
         else:
+            up_u = new_l
+    upper = _fc_edge(N_exp,b,CL,low_u,up_u,tol,True)
+
+    # Bracket the lower limit, where the largest accepted count
+    # reaches N_exp
+    if fc_limits(0,b,CL)[1] >= N_exp:
+        return 0.,float(upper)
+    low_l,up_l = 0.,up_u
+    while up_l - low_l > 0.25:
+        new_l = 0.5 * (low_l + up_l)
+        if fc_limits(new_l,b,CL)[1] >= N_exp:
             up_l = new_l
-    up_limit = low_l
-
-
-    return low_limit,up_limit
+        else:
+            low_l = new_l
+    lower = _fc_edge(N_exp,b,CL,low_l,up_l,tol,False)
+    return float(lower),float(upper)
@@ -4,3 +4,10 @@ from .FeldmanCousinsLimit import FeldmanCousinsLimit
 from .CLsLimit import cls_limit
 from .UpperLimitBkgFree import upper_limit
 from .FeldmanCousinsLimit import fc_interval
+from .FCBeltTable import FCBeltTable
+from .poisson_ul import cls_ul_batch
+from .poisson_ul import bayes_unif_ul_batch
+from .poisson_ul import bayes_jeffreys_ul_batch
+from .maximum_gap import maximum_gap_ul
+from .CmaxTable import CmaxTable
+from .optimum_interval import optimum_interval_ul
@@ -4,22 +4,178 @@ Maximum gap method described by Yellin. This is a
 method for finding an upper limit with an unknown background
 and a non-zero number of events.
 
-TODO:
-    Complete module
+S. Yellin, Phys. Rev. D66 (2002) 032005.
 
+The gaps are measured in expected signal events, using the
+cumulative measured spectrum from the analytic rate calculator
+of an Experiment, so no Monte Carlo is needed.
 """
+__author__ = 'Jeremy P. Lopez'
+__date__ = 'June 2017'
+__copyright__ = '(c) 2017, Jeremy P. Lopez'
 
+import numpy as np
+import scipy.special
 
 
-def maximum_gap_ul(E,Emin,Emax,model,cl=0.9,Ntrials=1000000):
-    print('This is still under development! Returning')
-    return -1
+def C0(x,mu):
+    """ Probability that the maximum gap is smaller than x
+        when mu events are expected in total (Yellin's C0):
 
-    Evec = set(E + [Emin,Emax])
-    gaps = np.zeros(len(Evec)-1)
+        C0 = sum_{k=0}^{m} (kx-mu)^k e^{-kx} / k! (1 + k/(mu-kx)),
 
-    model.initialize()
-    for i in range(Ntrials):
-        pass             
+        with m = floor(mu/x). The terms are written as
+        e^{-kx}/k! [(kx-mu)^k - k (kx-mu)^(k-1)] so that k = mu/x
+        needs no special case.
 
+        The series alternates, so precision is lost for
+        mu/x larger than about 50.
 
+        Args:
+            x: Expected events in the maximum gap (float or array)
+            mu: Total expected events (float or array)
+
+        Returns:
+            C0 (same shape as the broadcast x and mu)
+    """
+    x,mu = np.broadcast_arrays(np.asarray(x,dtype=float),
+                               np.asarray(mu,dtype=float))
+    with np.errstate(divide='ignore',invalid='ignore'):
+        m = np.where(x > 0,np.floor(mu / x),0)
+    m = np.where(x >= mu,np.minimum(m,1),m)
+    k = np.arange(int(np.max(m,initial=0)) + 1).reshape((-1,) + (1,)*x.ndim)
+
+    y = k * x - mu
+    with np.errstate(divide='ignore',invalid='ignore',over='ignore'):
+        # (kx-mu)^(k-1), which is 0 for k = 0
+        ykm1 = np.where(k > 0,y ** np.maximum(k-1,0),0)
+        terms = (np.exp(-k * x - scipy.special.gammaln(k + 1))
+                 * (y ** k - k * ykm1))
+    terms = np.where(k <= m,terms,0)
+    result = np.sum(terms,axis=0)
+    # With the gap covering everything, C0 = 1 - exp(-mu)
+    result = np.where(x >= mu,-np.expm1(-mu),result)
+    return np.clip(result,0,1)[()]
+
+def maximum_gap_scale(x0,mu0,cl=0.9,tol=1e-6,max_iter=200):
+    """ Factor by which the signal must be scaled for the
+        maximum gap to be excluded at the given confidence level.
+        Solves C0(f x0, f mu0) = cl for f by bisection, for
+        arrays of (x0,mu0) at once.
+
+        Args:
+            x0: Expected events in the maximum gap at the
+                reference cross section (float or array)
+            mu0: Total expected events at the reference cross
+                 section (float or array)
+            cl: The confidence level
+            tol: Relative tolerance on f
+            max_iter: Maximum number of bracket doublings
+
+        Returns:
+            The scale factors f, or inf where no signal is
+            expected (mu0 = 0)
+    """
+    x0,mu0 = np.broadcast_arrays(np.asarray(x0,dtype=float),
+                                 np.asarray(mu0,dtype=float))
+    # Without expected signal no scale can be excluded. Solve
+    # a dummy problem there and replace the result at the end.
+    no_signal = mu0 <= 0
+    x0 = np.where(no_signal,1.,x0)
+    mu0 = np.where(no_signal,1.,mu0)
+    # For no events the limit is -log(1-cl) expected events
+    hi = -np.log(1 - cl) / np.where(x0 > 0,x0,1) * 2
+    lo = np.zeros(x0.shape)
+    for it in range(max_iter):
+        low = C0(hi * x0,hi * mu0) < cl
+        if not np.any(low):
+            break
+        lo = np.where(low,hi,lo)
+        hi = np.where(low,2 * hi,hi)
+
+    while np.any(hi - lo > tol * hi):
+        mid = 0.5 * (lo + hi)
+        low = C0(mid * x0,mid * mu0) < cl
+        lo = np.where(low,mid,lo)
+        hi = np.where(low,hi,mid)
+    return np.where(no_signal,np.inf,0.5 * (lo + hi))[()]
+
+def expected_counts(E,Emin,Emax,model):
+    """ Cumulative expected events at each measured event
+        at the experiment's current cross section.
+
+        Args:
+            E: Measured event energies
+            Emin: Minimum energy in the analysis
+            Emax: Maximum energy in the analysis
+            model: An initialized Experiment
+
+        Returns:
+            Expected events below Emin, each event in
+            [Emin,Emax) in increasing order, and Emax
+    """
+    E = np.sort(np.asarray(E,dtype=float).reshape(-1))
+    E = E[(Emin <= E) & (E < Emax)]
+    edges = np.concatenate(([Emin],E,[Emax]))
+    return model.rate_calculator.cumulative_meas(edges,Emin) \
+           * model.exposure
+
+def gaps(E,Emin,Emax,model):
+    """ Maximum gap and total expected events for a dataset
+        at the experiment's current cross section.
+
+        Args:
+            E: Measured event energies
+            Emin: Minimum energy in the analysis
+            Emax: Maximum energy in the analysis
+            model: An initialized Experiment
+
+        Returns:
+            (x0,mu0): Expected events in the maximum gap and
+                      in the whole range
+    """
+    counts = expected_counts(E,Emin,Emax,model)
+    return np.max(np.diff(counts)),counts[-1]
+
+def maximum_gap_ul(E,Emin,Emax,model,cl=0.9,masses=None,tol=1e-6):
+    """ Maximum gap upper limit on the cross section.
+
+        The limit is the cross section at which the largest
+        gap between events (or the analysis bounds) would be
+        smaller than observed with probability cl. The gap
+        sizes come from the analytic measured spectrum of the
+        experiment, and all masses are solved together.
+
+        Args:
+            E: Measured event energies
+            Emin: Minimum energy in the analysis
+            Emax: Maximum energy in the analysis
+            model: An Experiment. Its interaction cross section
+                   is the reference for the limit.
+            cl: The confidence level
+            masses: WIMP masses to scan. If None, use the
+                    current mass.
+            tol: Relative tolerance on the limit
+
+        Returns:
+            The cross section limit (float, or an array for
+            an array of masses)
+    """
+    xs0 = model.interaction.total_xs
+    if masses is None:
+        model.rate_calculator.initialize()
+        x0,mu0 = gaps(E,Emin,Emax,model)
+    else:
+        Mx = model.interaction.Mx
+        x0 = np.empty(np.size(masses))
+        mu0 = np.empty(np.size(masses))
+        for i,m in enumerate(np.reshape(masses,-1)):
+            model.interaction.Mx = m
+            model.rate_calculator.initialize()
+            x0[i],mu0[i] = gaps(E,Emin,Emax,model)
+        model.interaction.Mx = Mx
+        model.rate_calculator.initialize()
+        x0 = x0.reshape(np.shape(masses))
+        mu0 = mu0.reshape(np.shape(masses))
+
+    return xs0 * maximum_gap_scale(x0,mu0,cl,tol)
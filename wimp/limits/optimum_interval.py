@@ -0,0 +1,198 @@
+""" optimum_interval.py
+
+Optimum interval method described by Yellin. This extends
+the maximum gap method to intervals containing any number
+of events, which gives stronger limits when there are
+several events in the signal region.
+
+S. Yellin, Phys. Rev. D66 (2002) 032005.
+
+The distribution of Cmax has to be found by Monte Carlo. The
+tables in CmaxTable only depend on the signal mean, so a
+default table is built once with cmax_table(build=True) and
+stored in the on-disk cache directory. Limits load it from
+there unless they are given a table, and then only need the
+interval scan over the observed events.
+"""
+__author__ = 'Jeremy P. Lopez'
+__date__ = 'June 2017'
+__copyright__ = '(c) 2017, Jeremy P. Lopez'
+
+import hashlib
+import os
+import zipfile
+import numpy as np
+from .CmaxTable import CmaxTable, interval_sizes
+from .maximum_gap import expected_counts
+from ..xsec.ff_cache import cache_dir
+
+# Settings for the default table
+default_mu = np.geomspace(1.,100.,81)
+default_ntoys = 50000
+default_n_max = 50
+default_cl = np.linspace(0.5,0.99,50)
+default_npoints = 513
+default_seed = 1
+
+_table = None
+
+
+def _default_path():
+    """ File name of the default table in the cache directory. """
+    h = hashlib.sha1()
+    for value in (default_mu,default_ntoys,default_n_max,default_cl,
+                  default_npoints,default_seed):
+        value = np.asarray(value)
+        h.update(str(value.dtype).encode())
+        h.update(str(value.shape).encode())
+        h.update(value.tobytes())
+    return os.path.join(cache_dir(),'CmaxTable_' + h.hexdigest() + '.npz')
+
+def cmax_table(build=False,processes=None):
+    """ The default Cmax table, loaded from the cache directory
+        the first time it is needed.
+
+        Args:
+            build: If there is no usable table in the cache,
+                   build one (about half a minute per CPU) and
+                   save it
+            processes: Number of worker processes for a build
+
+        Returns:
+            CmaxTable
+
+        Raises:
+            FileNotFoundError if there is no usable table and
+            build is False
+    """
+    global _table
+    if _table is not None:
+        return _table
+
+    path = _default_path()
+    try:
+        _table = CmaxTable.load(path)
+        return _table
+    except (OSError,KeyError,ValueError,EOFError,zipfile.BadZipFile):
+        # Missing, truncated or corrupt files are rebuilt
+        if not build:
+            raise FileNotFoundError('optimum_interval: no usable Cmax '
+                                    'table at ' + path + '. Build it with '
+                                    'cmax_table(build=True).')
+
+    _table = CmaxTable(default_mu,cl=default_cl,n_max=default_n_max,
+                       ntoys=default_ntoys,npoints=default_npoints,
+                       seed=default_seed,processes=processes)
+    try:
+        os.makedirs(os.path.dirname(path),exist_ok=True)
+        _table.save(path)
+    except OSError as e:
+        print('optimum_interval: could not save',path,':',e)
+    return _table
+
+def optimum_interval_scale(u,mu0,cl=0.9,table=None,tol=1e-6):
+    """ Signal mean excluded by the optimum interval method,
+        for event positions given as fractions of the expected
+        spectrum. Arrays of spectra are solved together by
+        bisection in log(mu).
+
+        Args:
+            u: Sorted event fractions in [0,1], shape (N,) or
+               (M,N) for M spectra
+            mu0: Total expected events at the reference cross
+                 section (float or array of length M)
+            cl: The confidence level
+            table: CmaxTable. If None, use the cached default
+                   table from cmax_table().
+            tol: Relative tolerance on the mean
+
+        Returns:
+            The factors by which the signal must be scaled. They
+            are inf where the limit is above the largest mean in
+            the table and nan where it is below the smallest.
+    """
+    if table is None:
+        table = cmax_table()
+    mu0 = np.asarray(mu0,dtype=float)
+    u = np.asarray(u,dtype=float)
+    u = u.reshape((mu0.size,u.size // max(mu0.size,1)))
+    N = u.shape[1]
+    # The interval scan only depends on the data
+    x = interval_sizes(u,table.n_max)
+    valid = np.arange(table.n_max+1) <= N
+
+    # A mean is only excluded if Cmax is strictly above the
+    # percentile. At small means Cmax is largest for no events,
+    # which then ties with the percentile.
+    def excluded(mu):
+        cmax = np.max(np.where(valid,table.C_n(x,mu),0),axis=1)
+        return cmax > table.cmax_bar(cl,mu) + 1e-9
+
+    # Cmax is never above 1-exp(-mu), its value for no events,
+    # so means where no events has a probability above 1-cl
+    # cannot be excluded. Starting there also avoids the kink
+    # in the percentile at that point.
+    mu_min = -np.log(1 - cl)
+    lo = np.full(mu0.size,max(table.mu[0],mu_min))
+    hi = np.full(mu0.size,table.mu[-1])
+    # Limits outside the table cannot be found
+    above = ~excluded(hi)
+    below = excluded(lo) if table.mu[0] > mu_min else np.zeros(mu0.size,bool)
+    while np.any(hi > lo * (1 + tol)):
+        mid = np.sqrt(lo * hi)
+        low = ~excluded(mid)
+        lo = np.where(low,mid,lo)
+        hi = np.where(low,hi,mid)
+    scale = np.sqrt(lo * hi) / mu0
+    scale = np.where(above,np.inf,np.where(below,np.nan,scale))
+    return scale.reshape(mu0.shape)[()]
+
+def optimum_interval_ul(E,Emin,Emax,model,cl=0.9,masses=None,table=None,
+                        tol=1e-6):
+    """ Optimum interval upper limit on the cross section.
+
+        The events are placed on the cumulative measured spectrum
+        from the analytic rate calculator of the experiment, and
+        the limit is the cross section at which the observed
+        Cmax equals its cl percentile for signal only.
+
+        Args:
+            E: Measured event energies
+            Emin: Minimum energy in the analysis
+            Emax: Maximum energy in the analysis
+            model: An Experiment. Its interaction cross section
+                   is the reference for the limit.
+            cl: The confidence level
+            masses: WIMP masses to scan. If None, use the
+                    current mass.
+            table: CmaxTable. If None, use the cached default
+                   table from cmax_table().
+            tol: Relative tolerance on the limit
+
+        Returns:
+            The cross section limit (float, or an array for
+            an array of masses). It is inf or nan where the
+            limit is outside the table (see
+            optimum_interval_scale()).
+    """
+    xs0 = model.interaction.total_xs
+    if masses is None:
+        model.rate_calculator.initialize()
+        counts = expected_counts(E,Emin,Emax,model)[np.newaxis]
+    else:
+        Mx = model.interaction.Mx
+        counts = []
+        for m in np.reshape(masses,-1):
+            model.interaction.Mx = m
+            model.rate_calculator.initialize()
+            counts.append(expected_counts(E,Emin,Emax,model))
+        model.interaction.Mx = Mx
+        model.rate_calculator.initialize()
+        counts = np.array(counts)
+
+    mu0 = counts[:,-1]
+    u = counts[:,1:-1] / mu0[:,np.newaxis]
+    scale = optimum_interval_scale(u,mu0,cl,table,tol)
+    if masses is None:
+        return xs0 * float(scale[0])
+    return xs0 * scale.reshape(np.shape(masses))
@@ -15,8 +15,9 @@ Implemented here are:
   prior. This is equivalent to the CL_s limit.
 * Bayesian upper limit with a Jeffreys prior and background model.
 
-The first 4 of these should be working correctly and some
-validation is probably needed for the last.
+The CLs and Bayesian limits use closed forms in terms of the
+regularized incomplete gamma function. The *_batch versions
+take arrays of (N,b) and solve for all of the limits at once.
 
 TODO:
   Many of the methods here are also included in the other
@@ -25,6 +26,14 @@ TODO:
   than classes that need to know about the specific model.
 
 """
+__author__ = 'Jeremy P. Lopez'
+__date__ = 'June 2017'
+__copyright__ = '(c) 2017, Jeremy P. Lopez'
+
+import numpy as np
+import scipy.stats
+import scipy.special
+from .FeldmanCousinsLimit import fc_interval
 
 def freq_bkg_free_ul(N_exp=0,CL=0.9,tol=1e-4):
     """ Function to calculate Poisson upper limits.
@@ -71,6 +80,107 @@ def freq_bkg_free_ul(N_exp=0,CL=0.9,tol=1e-4):
         
     return 0,n_limit
 
+def _gamma_ratio_ul(a,b,CL=0.9,tol=1e-4,max_iter=200):
+    """ Solves Q(a,s+b) / Q(a,b) = 1 - CL for s, where Q is the
+        regularized upper incomplete gamma function, for arrays
+        of a and b.
+
+        The ratio falls monotonically from 1 at s = 0, so the
+        root is bracketed and then found by bisection. Every
+        limit converges to within tol.
+
+        Args:
+            a: Shape parameters (array)
+            b: Expected numbers of backgrounds (array)
+            CL: The confidence level
+            tol: Absolute tolerance on s
+            max_iter: Maximum number of bracket doublings
+
+        Returns:
+            The values of s (array)
+    """
+    a,b = np.broadcast_arrays(np.asarray(a,dtype=float),
+                              np.asarray(b,dtype=float))
+    alpha = 1 - CL
+    Qb = scipy.special.gammaincc(a,b)
+    # For b >> a, Qb underflows and the ratio goes to exp(-s)
+    tiny = Qb < 1e-300
+    Qb = np.where(tiny,1.,Qb)
+
+    def excess(s):
+        return scipy.special.gammaincc(a,s+b) / Qb - alpha
+
+    lo = np.zeros(a.shape)
+    hi = a + 10 * np.sqrt(a) + 10
+    for it in range(max_iter):
+        open_ = excess(hi) > 0
+        if not np.any(open_ & ~tiny):
+            break
+        lo = np.where(open_,hi,lo)
+        hi = np.where(open_,2 * hi,hi)
+
+    while np.any(hi - lo > tol):
+        mid = 0.5 * (lo + hi)
+        above = excess(mid) > 0
+        lo = np.where(above,mid,lo)
+        hi = np.where(above,hi,mid)
+
+    s = 0.5 * (lo + hi)
+    return np.where(tiny,-np.log(alpha),s)
+
+def cls_ul_batch(N,b,CL=0.9,tol=1e-4):
+    """ CLs upper limits for arrays of counting experiments.
+
+    Uses P(n <= N | mu) = Q(N+1,mu) and solves
+    CLs = Q(N+1,s+b) / Q(N+1,b) = 1 - CL by bisection.
+
+    Args:
+        N: The numbers of measured events (int or array)
+        b: The expected numbers of backgrounds (float or array)
+        CL: The confidence level
+        tol: Absolute tolerance on the limits
+
+    Returns:
+        The upper limits on the signal mean (same shape as the
+        broadcast N and b)
+    """
+    N = np.asarray(N)
+    return _gamma_ratio_ul(N + 1,b,CL,tol)[()]
+
+def bayes_unif_ul_batch(N_exp,b,CL=0.9,tol=1e-4):
+    """ Bayesian upper limits with a uniform prior for arrays
+    of counting experiments. Identical to the CLs limits.
+
+    Args:
+        N_exp: The numbers of measured events (int or array)
+        b: The expected numbers of backgrounds (float or array)
+        CL: The confidence level
+        tol: Absolute tolerance on the limits
+
+    Returns:
+        The upper limits on the signal mean
+    """
+    return cls_ul_batch(N_exp,b,CL,tol)
+
+def bayes_jeffreys_ul_batch(N_exp,b,CL=0.9,tol=1e-4):
+    """ Bayesian upper limits with a Jeffreys prior,
+    1/sqrt(s+b), for arrays of counting experiments.
+
+    The posterior is proportional to (s+b)^(N-1/2) exp(-(s+b)),
+    so the limit solves Q(N+1/2,s+b) / Q(N+1/2,b) = 1 - CL.
+
+    Args:
+        N_exp: The numbers of measured events (int or array)
+        b: The expected numbers of backgrounds (float or array)
+        CL: The confidence level
+        tol: Absolute tolerance on the limits
+
+    Returns:
+        The upper limits on the signal mean
+    """
+    N_exp = np.asarray(N_exp)
+    return _gamma_ratio_ul(N_exp + 0.5,b,CL,tol)[()]
+
 def cls_ul(N,b,CL=0.9, tol = 1e-4):
     """ Calculates CLs limits based on a counting experiment.
         
@@ -82,36 +192,13 @@ def cls_ul(N,b,CL=0.9, tol = 1e-4):
         N: The number of measured events
         b: The expected number of backgrounds
         CL: The confidence level
-        tol: The tolerance used for stopping
+        tol: Absolute tolerance on the limit
 
     Returns:
         (s_low,s_high): The lower and upper limits of the interval
                         s_low = 0 here
     """
-    pvb = scipy.stats.poisson.cdf(N,b)
-    
-    s = max(5,N-b) # 5 is just arbitrary here
-    #nmax = 20
-    it = 0
-    while(1):#it<nmax):
-       it+=1
-       pois = np.array([scipy.stats.poisson.pmf(i,s+b) 
-                        for i in range(0,N+1)])
-       sum1 = np.sum(pois)
-       CLs = sum1 / pvb
- #      print(s,CLs,sum1,pvb)
-       diff = 1-CL - CLs
-       dfds = -np.sum( (np.arange(0,N+1)/(1.0*s+b) -1)*pois )/pvb
-
-       if diff/dfds < s:
-           s = s - diff/dfds
-       else:
-           s = s * 0.5
-
-       if np.abs(diff/(1.0-CL)) < tol:
-           break
-
-    return 0, s
+    return 0, float(cls_ul_batch(N,b,CL,tol))
 
 def bayes_unif_ul(N_exp=0,b=0,CL=0.9,tol=1e-4):
     """ Returns a Bayesian upper limit with a uniform 
@@ -123,13 +210,13 @@ def bayes_unif_ul(N_exp=0,b=0,CL=0.9,tol=1e-4):
         N: The number of measured events
         b: The expected number of backgrounds
         CL: The confidence level
-        tol: The tolerance used for stopping
+        tol: Absolute tolerance on the limit
 
     Returns:
         (s_low,s_high): The lower and upper limits of the interval
                         s_low = 0 here
     """
-    return cls_limit(N_exp,b,CL, tol)
+    return cls_ul(N_exp,b,CL, tol)
 
 def bayes_jeffreys_ul(N_exp=0,b=0,CL=0.9,tol=1e-4):
     """ Returns a Bayesian upper limit with a Jeffreys 
@@ -139,147 +226,26 @@ def bayes_jeffreys_ul(N_exp=0,b=0,CL=0.9,tol=1e-4):
         N: The number of measured events
         b: The expected number of backgrounds
         CL: The confidence level
-        tol: The tolerance used for stopping
+        tol: Absolute tolerance on the limit
 
     Returns:
         (s_low,s_high): The lower and upper limits of the interval
                         s_low = 0 here
     """
-
-    err = 2
-    fn_last = np.zeros(3) + 2
-    s = 0.5*np.sqrt(N_exp)+N_exp # First guess
-
-    g1_2 = scipy.special.gamma(N_exp+0.5)
-
-    denom = scipy.special.gammaincc(N_exp+0.5,b)
-    num_bkg = scipy.special.gammainc(N_exp+0.5,b)
-    while(1): 
-          
-        integrand = exp(-(s+b)) * (s+b)**(N_exp+0.5)
-        num_sb = scipy.special.gammainc(N_exp+0.5,s+b)
-        fs = CL - (num_sb - num_bkg) / denom
-        dfds = integrand / (g1_2 * denom)
-        # Newton's method:
-        s = s - fn / dfdn
-        if n_limit <= 0:
-            print('Error: Mean has fallen below 0')
-            print(n_limit,fn,dfdn,fn/dfdn)
-            return 0
-         err = np.max( np.abs(fn )) / (1-CL)
-        if np.abs( 1 - fn_last[2]/fn ) < (tol)**2 :
-            s = s + tol
-        fn_last[0] = fn_last[1]
-        fn_last[1] = fn_last[2]
- 
-    return 0,s
+    return 0, float(bayes_jeffreys_ul_batch(N_exp,b,CL,tol))
 
 
 def feldman_cousins(N_exp=0,b=0,CL=0.9):
     """ Function to calculate Feldman-Cousins confidence
-        intervals.
+        intervals. Uses the vectorized belt construction in
+        FeldmanCousinsLimit.
 
         Args:
             N_exp: (int)  Number of measured events. Default: 0
             b: (float) Expected number of backgrounds. Default: 0
             CL: (float, 0-1) Confidence level. 
-    """
-    
-    def fc_limits(s,bkg=0,CL0=0.9):
-        """ Function to calculate bounds on the number of measured
-            events for a model given the Feldman-Cousins ordering
-            principle.
-    
-            Args:
-                s: The expected number of signal events
-                bkg: The expected number of background events
-                CL0: The confidence interval
-    
-            Returns:
-                The CL bounds on the number of expected events
-                in the experiment given a signal and background
-                model.
-        """
-        # Get approx. # of sigma:
-        sigma = scipy.special.erfinv(CL0) * np.sqrt(2)
-        N_max = int(max(s+b + 4*sigma * np.sqrt(s+bkg),20) )
-        # Should be enough for a reasonable data set
-        while True:
-            N_max = N_max * 2
-            ratio = np.zeros(N_max)
-            pval = np.zeros(N_max)
-            for n in range(N_max):
-                pval[n] = scipy.stats.poisson.pmf(n,s+bkg)
-                pbest = 1e4
-                if b > n:
-                    pbest = scipy.stats.poisson.pmf(n,bkg)
-              
-                    # minus sign is because sorting is in ascending order
-                else:
-                    pbest = scipy.stats.poisson.pmf(n,n)
-                ratio[n] = -pval[n] / pbest  
-            sorted_indices = np.argsort(ratio)
-            total_prob = 0
-            lim_min = N_max
-            lim_max = -1
-            n = 0
-            while total_prob < CL0 and n < len(ratio):
-                total_prob += pval[sorted_indices[n]]
-                if sorted_indices[n] < lim_min:
-                    lim_min = sorted_indices[n]
-                if sorted_indices[n] > lim_max:
-                    lim_max = sorted_indices[n]
-                n = n+1
-        
-            if lim_max < N_max-1:
-                break
-      
-        return lim_min,lim_max,total_prob
-
-    low_limit = 0
-    sigma = scipy.special.erfinv(CL) * np.sqrt(2)
-    up_limit = int(max(N_exp+10*sigma*np.sqrt(N_exp),20))
-
-    lim_minl,lim_maxl,total_probl = fc_limits(low_limit,b,CL)
-
-    lim_minu,lim_maxu,total_probu = fc_limits(up_limit,b,CL)
-    while lim_minu <= N_exp:
-        up_limit = 2 * up_limit
-        lim_minu,lim_maxu,total_probu = \
-                 fc_limits(up_limit,b,CL)
 
-    upper_lim = False
-    
-    if lim_minl <= N_exp < lim_maxl:
-        upper_lim = True # We want an interval in this case
-        print("Calculating upper limit")
-    # Binary search for the limit
-    if upper_lim == False:
-        low_l = low_limit
-        up_l = up_limit
-        
-        while up_l - low_l > FeldmanCousinsLimit._tol:
-            new_l = 0.5 * (up_l - low_l) + low_l
-            minl, maxl, total_prob = fc_limits(new_l,b,CL)
-            if maxl >= N_exp:
-                up_l = new_l
-            else:
-                low_l = new_l
-        low_limit = low_l
-
-    # Upper limit now
-
-    low_l = 0
-    up_l = up_limit
-    
-    while up_l - low_l > FeldmanCousinsLimit._tol:
-        new_l = 0.5 * (up_l - low_l) + low_l
-        minl, maxl, total_prob = fc_limits(new_l,Nb,CL)
-        if minl <= N_exp:
-            low_l = new_l
-        else:
-            up_l = new_l
-    up_limit = low_l
-
-
- 
+        Returns:
+            The lower and upper limits on the signal mean
+    """
+    return fc_interval(N_exp,b,CL)
@@ -39,3 +39,82 @@ def get_axes(v,tol=1e-4):
     e3 = e3 / np.sqrt(e3.dot(e3))
 
     return (e1,e2,e3)
+
+def get_axes_batch(v,tol=1e-4):
+    """ Batched version of get_axes. Builds an orthogonal basis 
+        for each of N vectors with the same conventions, using
+        masks instead of branches for the degenerate cases.
+    
+        Args:
+            v: The vectors (N x 3 numpy array)
+            tol: The minimum allowed vector length 
+    
+        Returns:
+            A set of 3 (N x 3) arrays of orthogonal unit vectors. 
+            Row i of each array is the basis for v[i].
+    """
+    v = np.asarray(v,dtype=float).reshape(-1,3)
+    e1 = np.where((np.sum(v*v,axis=1) < tol*tol)[:,np.newaxis],
+                  np.array([0.,0.,1.]),v)
+    e1 = e1 / np.sqrt(np.sum(e1*e1,axis=1))[:,np.newaxis]
+
+    e2 = np.cross(e1,np.array([1.,0.,0.]))
+    e2[np.sum(e2*e2,axis=1) < 1e-8] = np.array([0.,1.,0.])
+    e2 = e2 / np.sqrt(np.sum(e2*e2,axis=1))[:,np.newaxis]
+
+    e3 = np.cross(e1,e2)
+    e3 = e3 / np.sqrt(np.sum(e3*e3,axis=1))[:,np.newaxis]
+
+    return (e1,e2,e3)
+
+def lab_directions(v,cosTheta,phi,tol=1e-4):
+    """ Rotates N directions given by (cos(theta),phi) relative
+        to the vectors v into the frame the vectors are given in.
+        Theta is measured from v[i] and phi from the second axis
+        of get_axes(v[i]).
+
+        Args:
+            v: The reference vectors (N x 3 numpy array)
+            cosTheta: The polar angle cosines (N)
+            phi: The azimuthal angles (N)
+            tol: The minimum allowed vector length 
+
+        Returns:
+            The unit direction vectors (N x 3 numpy array)
+    """
+    e1,e2,e3 = get_axes_batch(v,tol)
+    cosTheta = np.asarray(cosTheta,dtype=float)[:,np.newaxis]
+    phi = np.asarray(phi,dtype=float)[:,np.newaxis]
+    return (e1 * cosTheta
+            + np.sqrt(1-cosTheta*cosTheta)
+            * ( np.cos(phi) * e2 + np.sin(phi) * e3 ))
+
+def sph_j0(x):
+    """ Spherical Bessel function j0(x) = sin(x)/x, including
+        its limit of 1 at x = 0.
+
+        Args:
+            x: Value or array
+
+        Returns:
+            j0(x) (same shape as x)
+    """
+    # np.sinc(x) = sin(pi x)/(pi x) handles x = 0
+    return np.sinc(np.asarray(x,dtype=float) / np.pi)[()]
+
+def sph_j1_over_x(x):
+    """ Spherical Bessel function j1(x) divided by x, including
+        its limit of 1/3 at x = 0. The 0/0 form is replaced by
+        its expansion for |x| < 1e-3.
+
+        Args:
+            x: Value or array
+
+        Returns:
+            j1(x)/x (same shape as x)
+    """
+    x = np.asarray(x,dtype=float)
+    small = np.abs(x) < 1e-3
+    y = np.where(small,1.,x)
+    j1 = np.sin(y) / (y*y) - np.cos(y) / y
+    return np.where(small,(1 - x*x/10.) / 3.,j1 / y)[()]
@@ -8,6 +8,7 @@ __copyright__ = "(c) 2017, Jeremy P. Lopez"
 
 import numpy as np
 from .sample import Sample
+from .sample import SampleBatch
 from .. import mathtools
 from .. import units
 
@@ -21,6 +22,9 @@ class AcceptRejectSampler:
             interaction (InteractionModel)
             max_iter (int): Max # of iterations before
                             stopping throws
+            batch_size (int): Max # of proposals thrown together
+                              in sample_batch()
+            acceptance: Acceptance rate of the last sample_batch()
 
             vE: Earth velocity vector
             v0: Dispersion velocity
@@ -44,7 +48,7 @@ class AcceptRejectSampler:
     """
     def __init__(self,astro_model,int_model):
         """ Initialize object. Max iterations
-            set to 10000
+            set to 10000, batches of up to 100000 proposals.
 
             Args:
                 astro_model (AstroModel)
@@ -54,6 +58,8 @@ class AcceptRejectSampler:
         self.astro_model = astro_model
         self.interaction = int_model
         self.max_iter = 10000
+        self.batch_size = 100000
+        self.acceptance = 0
 
     @property
     def random(self):
@@ -84,9 +90,13 @@ class AcceptRejectSampler:
             Parameters:
                 AccRejMaxIter: Set the maximum # of
                                iterations before stopping
+                AccRejBatchSize: Set the maximum # of proposals
+                                 thrown together in sample_batch()
         """
         if 'AccRejMaxIter' in pars:
-            pars.max_iter = pars['AccRejMaxIter']
+            self.max_iter = pars['AccRejMaxIter']
+        if 'AccRejBatchSize' in pars:
+            self.batch_size = pars['AccRejBatchSize']
         if set_models:
            self.astro_model.set_params(pars)
            self.interaction.set_params(pars)
@@ -182,3 +192,84 @@ class AcceptRejectSampler:
 
         return Sample(Er,recoil_lab,1,vec)
 
+    def sample_batch(self,n):
+        """ Get n unweighted samples with vectorized rejection
+            sampling.
+
+            Proposals are thrown in batches and accepted with a
+            boolean mask until n events are collected. The batch
+            size follows the acceptance rate seen so far, up to
+            batch_size. As in sample(), throwing stops after
+            max_iter proposals per requested event, in which case
+            fewer than n samples are returned.
+
+            The acceptance rate achieved is saved in acceptance.
+
+            Args:
+                n (int): The number of samples
+
+            Returns:
+                SampleBatch with n unbiased samples, or fewer
+                if the iteration limit was reached.
+        """
+        acc = self.acceptance if self.acceptance > 0 else 0.1
+        vecs = []
+        Ers = []
+        Exs = []
+        naccepted = 0
+        ntried = 0
+        while naccepted < n:
+            if ntried >= self.max_iter * n:
+                print("Accept/Reject: Max iteration reached")
+                break
+            m = int(min(self.batch_size,
+                        max(1000,1.2 * (n - naccepted) / acc)))
+
+            # First, throw the velocities:
+            v = self._rand.rand(m)*(self.vmax-self.vmin) + self.vmin
+            cosTh = 2 * self._rand.rand(m) - 1
+            phi = self._rand.rand(m) * 2*np.pi
+            sinTh = np.sqrt(1-cosTh*cosTh)
+            vec = np.column_stack((v*sinTh*np.cos(phi),
+                                   v*sinTh*np.sin(phi),
+                                   v*cosTh))
+            vec_mag = np.abs(v)
+            Ex = 0.5 * self.Mx * (vec_mag/units.speed_of_light)**2
+            Emax = self.interaction.cross_section.MaxEr(Ex)
+            # Throw the recoil energies
+            Er = self._rand.rand(m) * Emax
+            Q2 = 2 * self.Mt * Er
+
+            # Throw the random probabilities
+            rnd = self._rand.rand(m) * self.maxP
+
+            # Calculate the probabilities:
+            P = (vec_mag**3 * self.astro_model.velocity.f(vec)
+                 * self.interaction.form_factor.ff2(Q2))
+            if np.any(P > self.maxP):
+                print( 'Illegal P found: ' +str(np.max(P)/self.maxP))
+
+            # Compare:
+            passed = P > rnd
+            vecs.append(vec[passed])
+            Ers.append(Er[passed])
+            Exs.append(Ex[passed])
+            naccepted += np.count_nonzero(passed)
+            ntried += m
+            if naccepted > 0:
+                acc = naccepted / ntried
+
+        self.acceptance = naccepted / ntried if ntried > 0 else 0
+
+        vec = np.concatenate(vecs)[:n] if vecs else np.zeros((0,3))
+        Er = np.concatenate(Ers)[:n] if Ers else np.zeros(0)
+        Ex = np.concatenate(Exs)[:n] if Exs else np.zeros(0)
+        m = Er.size
+
+        phi = self._rand.rand(m) * 2 * np.pi
+        cosTheta = self.interaction.cross_section.cosThetaLab(Ex,Er)
+
+        ## Let's go back into the lab frame:
+        recoil_lab = mathtools.lab_directions(vec,cosTheta,phi)
+
+        return SampleBatch(Er,recoil_lab,1,vec)
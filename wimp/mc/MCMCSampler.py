@@ -12,6 +12,7 @@ import numpy as np
 from .. import units
 from .. import mathtools
 from .sample import Sample
+from .sample import SampleBatch
 import numpy as np
 
 
@@ -54,10 +55,17 @@ class MCMCSampler:
             nburnin: The number of samples to get
                      on initialization
             Ntries: The number of throws before we accept a new value
-            lastv: The WIMP velocity for the last sample
-            lastE: The recoil energy for the last sample
-            lastP: The probability density for the last sample
-            Ex: The WIMP energy for the current sample
+            nchains: The number of independent chains advanced
+                     together by sample_batch()
+            chain_v: The WIMP velocities of all chains (nchains,3)
+            chain_E: The recoil energies of all chains (nchains,)
+            chain_Ex: The WIMP energies of all chains (nchains,)
+            chain_P: The probability densities of all chains (nchains,)
+            acceptance: Acceptance rate of the last sample_batch()
+            lastv: The WIMP velocity for the last sample (chain 0)
+            lastE: The recoil energy for the last sample (chain 0)
+            lastP: The probability density for the last sample (chain 0)
+            lastEx: The WIMP energy for the last sample (chain 0)
  
     """
     def __init__(self,astro_model,int_model):
@@ -67,6 +75,8 @@ class MCMCSampler:
         self.sigma = 20 * units.km / units.sec
         self.nburnin = 1000
         self.Ntries = 0
+        self.nchains = 1
+        self.acceptance = 0
 
     @property
     def random(self):
@@ -100,11 +110,15 @@ class MCMCSampler:
                           distribution
                MCMCNburnin: The number of throws to use on 
                             initialization to avoid bias
+               MCMCNchains: The number of chains run by
+                            sample_batch()
         """
         if 'MCMCSigma' in pars:
             self.sigma = pars['MCMCSigma']
         if 'MCMCNburnin' in pars:
-            self.nburnin = pars['MCMCnburnin']
+            self.nburnin = pars['MCMCNburnin']
+        if 'MCMCNchains' in pars:
+            self.nchains = pars['MCMCNchains']
         if set_models:
             self.astro_model.set_params(pars)
             self.interaction.set_params(pars)
@@ -126,33 +140,105 @@ class MCMCSampler:
 
         ### Now, run the burnin part
 
-        ### First, set up an initial guess:
-        vguess = 0.95*self.vesc * (self._rand.rand())**(0.33333)        
-        costhguess = 2 * self._rand.rand() - 1
-        phiguess = 2*np.pi * self._rand.rand()
+        ### First, set up an initial guess for every chain:
+        K = self.nchains
+        vguess = 0.95*self.vesc * (self._rand.rand(K))**(0.33333)
+        costhguess = 2 * self._rand.rand(K) - 1
+        phiguess = 2*np.pi * self._rand.rand(K)
         sinthguess = np.sqrt(1 - costhguess*costhguess)
-        self.lastv = np.array([vguess * np.cos(phiguess) * sinthguess,
-                               vguess * np.sin(phiguess) * sinthguess,
-                               vguess * costhguess] )
-        self.lastv = self.lastv - self.vE
-        vguess = np.sqrt(self.lastv.dot(self.lastv))
+        self.chain_v = np.column_stack(
+                            (vguess * np.cos(phiguess) * sinthguess,
+                             vguess * np.sin(phiguess) * sinthguess,
+                             vguess * costhguess))
+        self.chain_v = self.chain_v - self.vE
+        vguess = np.sqrt(np.sum(self.chain_v*self.chain_v,axis=1))
         Ex = 0.5 * self.Mx * (vguess/units.speed_of_light)**2
         Emax = self.interaction.cross_section.MaxEr(Ex)
-        self.lastE = self._rand.rand() * Emax
-        self.lastEx = Ex
-        Q2 = 2 * self.Mt * self.lastE        
-
-        self.lastP = (vguess
-                      * self.astro_model.velocity.f(self.lastv)
-                      * self.interaction.form_factor.ff2(Q2))
-                     
+        self.chain_E = self._rand.rand(K) * Emax
+        self.chain_Ex = Ex
+        Q2 = 2 * self.Mt * self.chain_E
+
+        self.chain_P = (vguess
+                        * self.astro_model.velocity.f(self.chain_v)
+                        * self.interaction.form_factor.ff2(Q2))
+
         # The other things that we're throwing (Er, phi_r)
         # will have flat priors so we don't need to save anything
 
-        for idx in range(self.nburnin): 
-            self.sample()
+        for idx in range(self.nburnin):
+            self._step_chains()
+
+    @property
+    def lastv(self):
+        """ The WIMP velocity of chain 0. """
+        return self.chain_v[0].copy()
+
+    @lastv.setter
+    def lastv(self,v):
+        self.chain_v[0] = v
+
+    @property
+    def lastE(self):
+        """ The recoil energy of chain 0. """
+        return self.chain_E[0]
+
+    @lastE.setter
+    def lastE(self,E):
+        self.chain_E[0] = E
+
+    @property
+    def lastEx(self):
+        """ The WIMP energy of chain 0. """
+        return self.chain_Ex[0]
+
+    @lastEx.setter
+    def lastEx(self,Ex):
+        self.chain_Ex[0] = Ex
+
+    @property
+    def lastP(self):
+        """ The probability density of chain 0. """
+        return self.chain_P[0]
+
+    @lastP.setter
+    def lastP(self,P):
+        self.chain_P[0] = P
+
+    def _step_chains(self):
+        """ Advance all chains by one Metropolis-Hastings step.
+
+            Same proposal and acceptance as sample(), done for
+            every chain at once.
+
+            Returns:
+                Boolean array of the chains that accepted
+                their proposal.
+        """
+        K = self.chain_v.shape[0]
+        # Propose new WIMP velocities
+        vprop = self._rand.normal(self.chain_v,self.sigma)
+        vec_mag = np.sqrt(np.sum(vprop*vprop,axis=1))
+        Ex = 0.5 * self.Mx * (vec_mag/units.speed_of_light)**2
+        Emax = self.interaction.cross_section.MaxEr(Ex)
+
+        ## Propose energies. See sample() for the acceptance.
+        Eprop = self._rand.rand(K)*Emax
+        Q2 = 2 * self.Mt * Eprop
+
+        Pprop = (vec_mag
+                 * self.astro_model.velocity.f(vprop)
+                 * self.interaction.form_factor.ff2(Q2))
+
+        with np.errstate(divide='ignore',invalid='ignore'):
+            alpha = np.minimum(1,Pprop / self.chain_P)
+        accept = (Pprop > 0) & (alpha > self._rand.rand(K))
+
+        self.chain_v[accept] = vprop[accept]
+        self.chain_E[accept] = Eprop[accept]
+        self.chain_Ex[accept] = Ex[accept]
+        self.chain_P[accept] = Pprop[accept]
+        return accept
 
- 
     def sample(self):
         """ Get a sample. Be careful: For a Markov Chain
             nearby samples are correlated. For uncorrelated throws,
@@ -220,3 +306,46 @@ class MCMCSampler:
 
         return Sample(self.lastE,recoil_lab,1,self.lastv)
 
+    def sample_batch(self,n):
+        """ Get n samples from the chains running in lockstep.
+
+            Each step advances all nchains chains with one set of
+            vectorized calls and yields one sample per chain, so
+            ceil(n/nchains) steps are needed. Consecutive samples
+            come from different chains. As with sample(), samples
+            from the same chain are correlated.
+
+            The acceptance rate achieved is saved in acceptance.
+
+            Args:
+                n (int): The number of samples
+
+            Returns:
+                SampleBatch with n samples
+        """
+        K = self.chain_v.shape[0]
+        nsteps = -(-n // K)
+        vec = np.zeros((nsteps,K,3))
+        Er = np.zeros((nsteps,K))
+        Ex = np.zeros((nsteps,K))
+        naccepted = 0
+        for i in range(nsteps):
+            naccepted += np.count_nonzero(self._step_chains())
+            vec[i] = self.chain_v
+            Er[i] = self.chain_E
+            Ex[i] = self.chain_Ex
+        self.acceptance = naccepted / (nsteps*K) if nsteps > 0 else 0
+
+        vec = vec.reshape(-1,3)[:n]
+        Er = Er.reshape(-1)[:n]
+        Ex = Ex.reshape(-1)[:n]
+
+        # Probabilities don't depend of phi so we'll throw a new phi
+        # no matter what
+        phi = self._rand.rand(n) * 2 * np.pi
+        cosTheta = self.interaction.cross_section.cosThetaLab(Ex,Er)
+
+        ## Let's go back into the lab frame:
+        recoil_lab = mathtools.lab_directions(vec,cosTheta,phi)
+
+        return SampleBatch(Er,recoil_lab,1,vec)
@@ -10,6 +10,7 @@ __copyright__ = "(c) 2017, Jeremy P. Lopez"
 
 import numpy as np
 from .sample import Sample
+from .sample import SampleBatch
 from .. import mathtools
 from .. import units
 
@@ -142,3 +143,49 @@ class MaxwellWeightedSampler:
 
         return Sample(E,recoil_lab,weight,vec)
 
+
+    def sample_batch(self,n):
+        """ Get a batch of samples with vectorized throws.
+
+            Equivalent to n calls to sample(), but every
+            quantity is thrown for the whole batch at once and
+            no Sample objects are created.
+
+            Args:
+                n (int): The number of samples
+
+            Returns:
+                SampleBatch with n biased samples and their
+                generator weights
+        """
+
+        vec = self._rand.normal(-self.vE,self.v0/np.sqrt(2),(n,3))
+        vec2 = vec + self.vE
+        vec2_sq = np.sum(vec2*vec2,axis=1)
+
+        #Probability to throw this from the full Maxwellian distribution
+        vec_prob = (1./(np.pi*self.v0*self.v0)**1.5
+                    * np.exp( - vec2_sq / (self.v0*self.v0) ) )
+
+        vec_mag = np.sqrt(np.sum(vec*vec,axis=1))
+        Ex = 0.5 * self.Mx * (vec_mag/units.speed_of_light)**2
+        Emax = self.interaction.cross_section.MaxEr(Ex)
+        weight = self.astro_model.velocity.f(vec) / vec_prob * vec_mag
+
+        ## Now let's look at the interaction part
+
+        E = self._rand.rand(n) * Emax
+        phi = self._rand.rand(n) * 2 * np.pi
+        cosTheta = self.interaction.cross_section.cosThetaLab(Ex,E)
+
+        ## Add in the form factor
+        Q2 = 2 * self.Mt * E
+        weight = weight * self.interaction.form_factor.ff2(Q2)
+
+        # Add in the constants so that we normalize to rate
+        weight *= self.xs * self.rho/self.Mx * self.Mtot/self.Mt
+
+        ## Let's go back into the lab frame:
+        recoil_lab = mathtools.lab_directions(vec,cosTheta,phi)
+
+        return SampleBatch(E,recoil_lab,weight,vec)
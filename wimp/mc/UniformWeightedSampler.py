@@ -12,6 +12,7 @@ import numpy as np
 from .. import units
 from .. import mathtools
 from .sample import Sample
+from .sample import SampleBatch
 
 
 class UniformWeightedSampler:
@@ -46,6 +47,7 @@ class UniformWeightedSampler:
             e2max: Maximum velocity in the e2 direction
             e3min: Minimum velocity in the e3 direction
             e3max: Maximum velocity in the e3 direction
+            chunk_size: Number of throws per chunk in sample_batch()
     """
     def __init__(self,astro_model,int_model):
         """ Initialize the object. 
@@ -57,6 +59,7 @@ class UniformWeightedSampler:
         self.astro_model = astro_model
         self.interaction = int_model
         self._rand = np.random
+        self.chunk_size = 100000
 
     @property
     def random(self):
@@ -84,7 +87,13 @@ class UniformWeightedSampler:
                pars {string}
                set_models: Also set the parameters for
                            the models
+
+           Parameters:
+               UnifChunkSize: The number of throws generated
+                              together in sample_batch()
         """
+        if 'UnifChunkSize' in pars:
+            self.chunk_size = pars['UnifChunkSize']
         if set_models:
             self.astro_model.set_params(pars)
             self.interaction.set_params(pars)
@@ -160,3 +169,76 @@ class UniformWeightedSampler:
 
         return Sample(E,recoil_lab,weight,vec)
 
+    def sample_batch(self,n):
+        """ Get the samples from n throws with vectorized calls.
+
+            Throws are generated in chunks of chunk_size with one
+            random number call per quantity. Throws outside of the
+            escape velocity have zero weight and are dropped before
+            anything else is calculated, so fewer than n samples
+            are usually returned. Rates should still be normalized
+            to the n throws.
+
+            Args:
+                n (int): The number of throws
+
+            Returns:
+                SampleBatch with the biased samples from the
+                throws with non-zero weight
+        """
+        chunks = []
+        nleft = n
+        while nleft > 0:
+            nchunk = min(nleft,self.chunk_size)
+            chunks.append(self._sample_chunk(nchunk))
+            nleft -= nchunk
+
+        if len(chunks) == 1:
+            return chunks[0]
+        return SampleBatch.concatenate(chunks)
+
+    def _sample_chunk(self,n):
+        """ Throw a single chunk for sample_batch().
+
+            Args:
+                n (int): The number of throws
+
+            Returns:
+                Same as sample_batch()
+        """
+        rnd = self._rand.rand(n,3)
+        vec = (self.e1*((self.e1max-self.e1min) * rnd[:,0:1] + self.e1min)
+               + self.e2*((self.e2max-self.e2min) * rnd[:,1:2] + self.e2min)
+               + self.e3*((self.e3max-self.e3min) * rnd[:,2:3] + self.e3min))
+
+        # Most of the box is outside of the escape velocity. Those
+        # throws have zero weight, so drop them right away.
+        vec2 = vec + self.vE
+        vec2_sq = np.sum(vec2*vec2,axis=1)
+        keep = vec2_sq < self.vesc*self.vesc
+        vec = vec[keep]
+        m = vec.shape[0]
+
+        vec_mag = np.sqrt(np.sum(vec*vec,axis=1))
+        # The factor of 1./vec_mag comes from v from the flux and 1/v^2
+        # from the recoil energy normalization
+        weight = self.vol * self.astro_model.velocity.f(vec) * vec_mag
+
+        ## Now let's look at the interaction part
+        Ex = 0.5 * self.Mx * (vec_mag/units.speed_of_light)**2
+        Emax = self.interaction.cross_section.MaxEr(Ex)
+
+        E = self._rand.rand(m) * Emax
+        phi = self._rand.rand(m) * 2 * np.pi
+        cosTheta = self.interaction.cross_section.cosThetaLab(Ex,E)
+
+        ## Add in the form factor
+        Q2 = 2 * self.Mt * E
+        weight = weight * self.interaction.form_factor.ff2(Q2)
+        # Add in the constants so that we normalize to rate
+        weight *= self.xs * self.rho/self.Mx * self.Mtot/self.Mt
+
+        ## Let's go back into the lab frame:
+        recoil_lab = mathtools.lab_directions(vec,cosTheta,phi)
+
+        return SampleBatch(E,recoil_lab,weight,vec)
@@ -3,3 +3,4 @@ from .MaxwellWeightedSampler import MaxwellWeightedSampler
 from .AcceptRejectSampler import AcceptRejectSampler
 from .MCMCSampler import MCMCSampler
 from .sample import Sample
+from .sample import SampleBatch
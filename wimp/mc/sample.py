@@ -1,12 +1,16 @@
 """ sample.py 
 
-    Module holding a class representing a single event.
+    Module holding classes representing a single event
+    and a batch of events.
 
 """
 __author__ = "Jeremy P. Lopez"
 __date__      = "June 2017"
 __copyright__ = "(c) 2017, Jeremy P. Lopez"
 
+import numpy as np
+
+
 class Sample:
     """ A class holding the information from a single
         event ('Sample') in the detector.
@@ -74,3 +78,258 @@ class Sample:
         """
         self._recoil_vec = rv
         self.recoil_vec_reco = rv
+
+
+class SampleBatch:
+    """ A class holding the information from many events
+        as columns of contiguous float64 arrays.
+
+        Batches can be sliced or masked like NumPy arrays
+        and concatenated. Indexing with an integer returns
+        a SampleView, which acts like a Sample but reads and
+        writes the batch columns directly.
+
+        Attributes:
+            Er_reco: Reconstructed recoil energies (N,)
+            recoil_vec_reco: Recoil direction vectors (N,3)
+            gen_weight: Generator weights (N,)
+            det_weight: Detector weights (N,), default: 1
+            wimp_vec: Initial WIMP velocity vectors (N,3)
+    """
+    _columns = ('_Er','_recoil_vec','gen_weight','wimp_vec',
+                'det_weight','Er_reco','recoil_vec_reco')
+
+    def __init__(self,Er,vrecoil,weight,vwimp):
+        """ Initialize. Reconstructed variables 
+            are initialized to the true values 
+            with detector weights of 1.
+
+            Args:
+                Er: Recoil energies (N,)
+                vrecoil: Recoil direction vectors (N,3)
+                weight: Generator weights (N,) or a single weight
+                vwimp: WIMP velocity vectors (N,3)
+        """
+        self._Er = np.ascontiguousarray(Er,dtype=np.float64)
+        n = self._Er.shape[0]
+        self._recoil_vec = np.ascontiguousarray(vrecoil,
+                                     dtype=np.float64).reshape(n,3)
+        self.gen_weight = np.ascontiguousarray(
+                             np.broadcast_to(weight,(n,)),dtype=np.float64)
+        self.wimp_vec = np.ascontiguousarray(vwimp,
+                                     dtype=np.float64).reshape(n,3)
+        self.det_weight = np.ones(n)
+        self.Er_reco = self._Er.copy()
+        self.recoil_vec_reco = self._recoil_vec.copy()
+
+    @classmethod
+    def from_samples(cls,samples):
+        """ Build a batch from a list of Sample objects.
+
+            Args:
+                samples: list of Sample
+
+            Returns:
+                SampleBatch
+        """
+        batch = cls(np.array([s.Er for s in samples],dtype=np.float64),
+                    np.array([s.recoil_vec for s in samples],
+                             dtype=np.float64).reshape(-1,3),
+                    np.array([s.gen_weight for s in samples],
+                             dtype=np.float64),
+                    np.array([s.wimp_vec for s in samples],
+                             dtype=np.float64).reshape(-1,3))
+        batch.Er_reco[:] = [s.Er_reco for s in samples]
+        batch.recoil_vec_reco[:] = np.reshape(
+                             [s.recoil_vec_reco for s in samples],(-1,3))
+        batch.det_weight[:] = [s.det_weight for s in samples]
+        return batch
+
+    @classmethod
+    def concatenate(cls,batches):
+        """ Join several batches into one.
+
+            Args:
+                batches: list of SampleBatch
+
+            Returns:
+                SampleBatch
+        """
+        batches = list(batches)
+        if len(batches) == 0:
+            return cls(np.zeros(0),np.zeros((0,3)),np.zeros(0),
+                       np.zeros((0,3)))
+        return cls._from_columns({name:np.concatenate(
+                                       [getattr(b,name) for b in batches])
+                                  for name in cls._columns})
+
+    @classmethod
+    def _from_columns(cls,cols):
+        """ Build a batch from existing columns without copying.
+
+            Args:
+                cols: {string: array} with every name in _columns
+        """
+        batch = cls.__new__(cls)
+        for name in cls._columns:
+            setattr(batch,name,cols[name])
+        return batch
+
+    def __len__(self):
+        """ The number of events. """
+        return self._Er.shape[0]
+
+    def __getitem__(self,key):
+        """ Get a single event or a sub-batch.
+
+            Args:
+                key: An integer index, a slice, a boolean mask
+                     or an array of indices
+
+            Returns:
+                A SampleView for an integer, otherwise a
+                SampleBatch. Slices give views of the columns,
+                masks and index arrays give copies, as in NumPy.
+        """
+        if isinstance(key,(int,np.integer)):
+            n = len(self)
+            if not -n <= key < n:
+                raise IndexError('SampleBatch index out of range')
+            return SampleView(self,key % n)
+        return SampleBatch._from_columns({name:getattr(self,name)[key]
+                                          for name in self._columns})
+
+    def __iter__(self):
+        """ Iterate over the events as SampleView objects. """
+        for i in range(len(self)):
+            yield SampleView(self,i)
+
+    @property
+    def weight(self):
+        """ The total weights (product of generator and
+            detector level weights)
+        """
+        return self.gen_weight * self.det_weight
+
+    @property
+    def Er(self):
+        """ The recoil energies. """
+        return self._Er
+
+    @Er.setter
+    def Er(self,er):
+        """ Set the recoil energies. The reconstructed
+            energies are set to the same values.
+
+            Args:
+                er: The recoil energies
+        """
+        self._Er = np.array(er,dtype=np.float64)
+        self.Er_reco = self._Er.copy()
+
+    @property
+    def recoil_vec(self):
+        """ The recoil direction vectors. """
+        return self._recoil_vec
+
+    @recoil_vec.setter
+    def recoil_vec(self,rv):
+        """ Set the recoil direction vectors. The reconstructed
+            directions are set to the same values.
+
+            Args:
+                rv: The recoil directions (N,3)
+        """
+        self._recoil_vec = np.array(rv,dtype=np.float64).reshape(-1,3)
+        self.recoil_vec_reco = self._recoil_vec.copy()
+
+
+class SampleView(Sample):
+    """ A single event of a SampleBatch with the Sample 
+        interface. Nothing is copied: attributes read and
+        write the batch columns at this event's index.
+    """
+    def __init__(self,batch,index):
+        """ Initialize.
+
+            Args:
+                batch: The SampleBatch
+                index: The event index
+        """
+        self._batch = batch
+        self._index = index
+
+    @property
+    def Er(self):
+        """ The recoil energy. """
+        return self._batch._Er[self._index]
+
+    @Er.setter
+    def Er(self,er):
+        """ Set the recoil energy and the reconstructed energy.
+
+            Args:
+                er: The recoil energy
+        """
+        self._batch._Er[self._index] = er
+        self._batch.Er_reco[self._index] = er
+
+    @property
+    def recoil_vec(self):
+        """ The recoil direction vector. """
+        return self._batch._recoil_vec[self._index]
+
+    @recoil_vec.setter
+    def recoil_vec(self,rv):
+        """ Set the recoil direction and the reconstructed direction.
+
+            Args:
+                rv: The recoil direction
+        """
+        self._batch._recoil_vec[self._index] = rv
+        self._batch.recoil_vec_reco[self._index] = rv
+
+    @property
+    def Er_reco(self):
+        """ The reconstructed recoil energy. """
+        return self._batch.Er_reco[self._index]
+
+    @Er_reco.setter
+    def Er_reco(self,er):
+        self._batch.Er_reco[self._index] = er
+
+    @property
+    def recoil_vec_reco(self):
+        """ The reconstructed recoil direction vector. """
+        return self._batch.recoil_vec_reco[self._index]
+
+    @recoil_vec_reco.setter
+    def recoil_vec_reco(self,rv):
+        self._batch.recoil_vec_reco[self._index] = rv
+
+    @property
+    def gen_weight(self):
+        """ The generator weight. """
+        return self._batch.gen_weight[self._index]
+
+    @gen_weight.setter
+    def gen_weight(self,w):
+        self._batch.gen_weight[self._index] = w
+
+    @property
+    def det_weight(self):
+        """ The detector weight. """
+        return self._batch.det_weight[self._index]
+
+    @det_weight.setter
+    def det_weight(self,w):
+        self._batch.det_weight[self._index] = w
+
+    @property
+    def wimp_vec(self):
+        """ The initial WIMP velocity vector. """
+        return self._batch.wimp_vec[self._index]
+
+    @wimp_vec.setter
+    def wimp_vec(self,v):
+        self._batch.wimp_vec[self._index] = v
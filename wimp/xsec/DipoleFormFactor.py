@@ -46,6 +46,7 @@ class DipoleFormFactor(FormFactor):
         """ Calculate |F(Q^2)|^2.
  
             Args:
-                Q2: Recoil squared momentum transfer
+                Q2: Recoil squared momentum transfer (value or array)
         """
-        return (1 + Q2/(scale*scale))**-2
+        Q2 = np.asarray(Q2,dtype=float)
+        return ((1 + Q2/(self.scale*self.scale))**-2)[()]
@@ -10,6 +10,7 @@ __copyright__ = '(c) 2017, Jeremy P. Lopez'
 
 from .FormFactor import FormFactor
 from .. import units
+from .. import mathtools
 import numpy as np
 
 
@@ -69,11 +70,11 @@ class EngelFormFactor(FormFactor):
         """ Calculate |F(Q^2)|^2.
  
             Args:
-                Q2: Recoil squared momentum transfer
+                Q2: Recoil squared momentum transfer (value or array)
         """
 
-        qrn = np.sqrt(Q2) * rn / units.hbarc
-        if 2.55 < qrn < 4.5:
-          return 0.047
-        j0 = np.sin(qrn) / qrn
-        return j0 * j0
+        qrn = np.sqrt(np.asarray(Q2,dtype=float)) * self.rn / units.hbarc
+        j0 = mathtools.sph_j0(qrn)
+        # The first zero is replaced by a plateau
+        plateau = (2.55 < qrn) & (qrn < 4.5)
+        return np.where(plateau,0.047,j0 * j0)[()]
@@ -8,6 +8,7 @@ __date__ = 'June, 2017'
 __copyright__ = '(c) 2017, Jeremy P. Lopez'
 
 from .FormFactor import FormFactor
+from .. import units
 import numpy as np
 
 
@@ -44,7 +45,7 @@ class ExpoFormFactor(FormFactor):
         """ Calculate |F(Q^2)|^2.
  
             Args:
-                Q2: Recoil squared momentum transfer
+                Q2: Recoil squared momentum transfer (value or array)
         """
-
-        return np.exp(-2 * Q2 / (scale * scale))    
+        Q2 = np.asarray(Q2,dtype=float)
+        return np.exp(-2 * Q2 / (self.scale * self.scale))[()]
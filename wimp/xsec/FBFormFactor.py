@@ -15,6 +15,7 @@ __date__ = 'June 2017'
 __copyright__ = '(c) 2017, Jeremy P. Lopez'
 
 from .. import units
+from .. import mathtools
 from .FormFactor import FormFactor
 
 import numpy as np
@@ -38,7 +39,7 @@ FBData = {
              0.30461e-2,0.35277e-2,-0.39834e-4,-0.97177e-4,0.92279e-4,
              -0.51931e-4,0.22958e-4,-0.86609e-5,0.28879e-5,-0.86632e-6))*_u,8.0*_u),
     (18,40):(3.423*_u,np.array((0.30451e-1,0.55337e-1,0.20203e-1,-0.16765e-1,-0.13578e-1,
-             -0.43204e-4,0.91988e-3,-0.41205e-3,0.11971e03,-0.19801e-4,
+             -0.43204e-4,0.91988e-3,-0.41205e-3,0.11971e-3,-0.19801e-4,
              -0.43204e-5,0.61205e-5,-0.37803e-5,0.18001e-5,-0.77407e-6))*_u,9.0*_u),
     (20,40):(3.450*_u,np.array((0.44846e-1,0.61326e-1,-0.16818e-2,-0.26217e-1,-0.29725e-2,
              0.85534e-2,0.35322e-2,-0.48259e-3,-0.39346e-3,0.20338e-3,
@@ -60,7 +61,7 @@ FBData = {
               0.74876e-4,0.32278e-3,-0.11353e-3))*_u,11.0*_u)
          }
 
-def FBFormFactor(FormFactor):
+class FBFormFactor(FormFactor):
     """ The Fourier-Bessel series form factor.
 
         This comes from a charge distribution defined by a sum of
@@ -117,22 +118,21 @@ def FBFormFactor(FormFactor):
         """ Calculate the form factor as a function of Q^2. 
 
             Args:
-                Q2: The squared momentum transfer (a positive value)
+                Q2: The squared momentum transfer (a positive value
+                    or an array of them)
         """
-        if Q2 <=0: 
-            return 1
-        q = np.sqrt(Q2)
-
-        A = np.sin(q*self._data[2]) / (q*self._data[2])
-     
-      
-        num = np.sum( np.array([ (-1)^(i%2) * self._data[1][i-1] /
-                        (i*i*np.pi*np.pi - Q2*self._data[2]**2) 
-                        for i in range(1,self._data[1].size+1) ]) )
-
-        denom = np.sum( np.array([ (-1)^(i%2) * self._data[1][i-1] / 
-                        (i*i*np.pi*np.pi)
-                          for i in range(1,self._data[1].size+1) ]) )
-
-        return A*A *num*num / (denom*denom)
+        Q2 = np.maximum(np.asarray(Q2,dtype=float),0)
+        R = self._data[2]
+        qR = np.sqrt(Q2) * R
+
+        A = mathtools.sph_j0(qR)
+
+        # Sum over the coefficients along the last axis
+        i = np.arange(1,self._data[1].size+1)
+        coef = (-1.)**(i+1) * self._data[1]
+        num = np.sum(coef / (i*i*np.pi*np.pi - Q2[...,np.newaxis]*R*R),
+                     axis=-1)
+        denom = np.sum(coef / (i*i*np.pi*np.pi))
+
+        return (A*A *num*num / (denom*denom))[()]
 
@@ -59,10 +59,13 @@ class FormFactor:
         the recoil energy
 
 
+        All form factors accept either a single value or a
+        NumPy array of Q^2 values.
+
         Args: 
         Q^2: Squared momentum transfer.
         
         Returns:
-        The form factor at Q^2
+        The form factor at Q^2 (same shape as Q^2)
         """
-        return 1
+        return np.ones_like(np.asarray(Q2,dtype=float))[()]
@@ -10,6 +10,7 @@ __copyright__ = '(c) 2017, Jeremy P. Lopez'
 
 from . import FormFactor
 from .. import units
+from .. import mathtools
 import numpy as np
 
 class HelmFormFactor(FormFactor):
@@ -87,10 +88,11 @@ class HelmFormFactor(FormFactor):
         """ Calculate |F(Q^2)|^2.
  
             Args:
-                Q2: Recoil squared momentum transfer
+                Q2: Recoil squared momentum transfer (value or array)
         """
+        Q2 = np.asarray(Q2,dtype=float)
         qrn = np.sqrt(Q2)*self.rn / units.hbarc
-         
-        j1 = np.sin(qrn) / (qrn*qrn) - np.cos(qrn) / qrn
+        f = 3 * mathtools.sph_j1_over_x(qrn)
 
-        return 9 * j1*j1 / (qrn*qrn) * np.exp(-Q2 * self.s*self.s / (units.hbarc*units.hbarc))
+        return (f*f * np.exp(-Q2 * self.s*self.s 
+                             / (units.hbarc*units.hbarc)))[()]
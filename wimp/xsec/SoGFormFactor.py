@@ -16,6 +16,7 @@ __copyright__ = '(c) 2017, Jeremy P. Lopez'
 
 import numpy as np
 from .. import units
+from .. import mathtools
 from .FormFactor import FormFactor
 _u = units.fm / units.hbarc
 
@@ -95,7 +96,7 @@ class SoGFormFactor(FormFactor):
         """ Get the normalization constant. """
         self.F0 = 1
         f0 = self.ff2(0)
-        self.F0 = f0
+        self.F0 = np.sqrt(f0)
  
 
     def set_data(self,data):
@@ -126,17 +127,19 @@ class SoGFormFactor(FormFactor):
         """ Calculate the form factor as a function of Q^2. 
 
             Args:
-                Q2: The squared momentum transfer (a positive value)
+                Q2: The squared momentum transfer (a positive value
+                    or an array of them)
         """
-        gamma = _data[3] / np.sqrt(1.5) 
-        A = exp(-0.25*Q2*gamma*gamma)
-        q = np.sqrt(Q2)
-
-        F = 0
-        for i in range(1,len(_data[1].size+1)):
-            F += _data[2][i-1] / (1 + 2 *(_data[1][i-1]/gamma)**2)  \
-                 * (np.cos(q * self._data[1][i-1]) 
-                    + 2 * (self._data[1][i-1]/gamma)**2
-                    * np.sin(q*self._data[1][i-1]) / (q * self._data[1][i-1]))
-
-        return F*F /self.F0 / self.F0
+        Q2 = np.maximum(np.asarray(Q2,dtype=float),0)
+        gamma = self._data[3] / np.sqrt(1.5) 
+        A = np.exp(-0.25*Q2*gamma*gamma)
+        q = np.sqrt(Q2)[...,np.newaxis]
+
+        # Sum over the Gaussians along the last axis
+        Ri = self._data[1]
+        r2 = 2 * (Ri/gamma)**2
+        F = A * np.sum(self._data[2] / (1 + r2)
+                       * (np.cos(q * Ri) + r2 * mathtools.sph_j0(q * Ri)),
+                       axis=-1)
+
+        return (F*F /self.F0 / self.F0)[()]
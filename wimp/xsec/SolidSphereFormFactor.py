@@ -10,6 +10,7 @@ __copyright__ = '(c) 2017, Jeremy P. Lopez'
 
 from . import FormFactor
 from .. import units
+from .. import mathtools
 import numpy as np
 
 class SolidSphereFormFactor(FormFactor):
@@ -73,11 +74,10 @@ class SolidSphereFormFactor(FormFactor):
         """ Calculate |F(Q^2)|^2.
  
             Args:
-                Q2: Recoil squared momentum transfer
+                Q2: Recoil squared momentum transfer (value or array)
         """
 
-        qrn = np.sqrt(Q2)*self.rn / units.hbarc
-         
-        j1 = np.sin(qrn) / (qrn*qrn) - np.cos(qrn) / qrn
+        qrn = np.sqrt(np.asarray(Q2,dtype=float))*self.rn / units.hbarc
+        f = 3 * mathtools.sph_j1_over_x(qrn)
 
-        return 9 * j1*j1 / (qrn*qrn)
+        return (f*f)[()]
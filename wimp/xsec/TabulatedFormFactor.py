@@ -0,0 +1,218 @@
+""" TabulatedFormFactor.py
+
+Wrapper that tabulates another form factor on an adaptive
+grid and evaluates it by spline interpolation.
+
+"""
+
+__author__ = 'Jeremy P. Lopez'
+__date__ = 'June 2017'
+__copyright__ = '(c) 2017, Jeremy P. Lopez'
+
+from .FormFactor import FormFactor
+from . import ff_cache
+from .. import units
+
+import numpy as np
+import scipy.interpolate
+
+class TabulatedFormFactor(FormFactor):
+    """
+    Tabulates any form factor over the kinematically allowed
+    range of Q^2 when initialize() is called, and afterwards
+    answers ff2 queries with a cubic spline.
+
+    The table is built on a grid in q = sqrt(Q^2), where
+    diffraction minima are evenly spaced. Starting from a
+    uniform grid, every interval whose midpoint differs from
+    the spline by more than (atol + rtol * |F|^2)/2 is split,
+    until all midpoints pass. Queries above the table range are
+    passed to the wrapped form factor.
+
+    By default the range is set from the target and WIMP masses
+    and the largest lab frame WIMP speed, vesc + |vE|.
+
+    If disk_cache is set, tables are loaded from and saved to
+    the on-disk cache in ff_cache, so other processes with the
+    same form factor and grid settings start from a finished
+    table.
+
+    Attributes:
+        form_factor: The wrapped FormFactor
+        rtol: Relative interpolation tolerance
+        atol: Absolute interpolation tolerance
+        ninit: Number of points in the initial grid
+        max_points: Maximum number of grid points
+        Q2max: Upper end of the table. If None, it is
+               calculated from Mt, Mx and vmax
+        Mt: Target nucleus mass
+        Mx: WIMP mass
+        vmax: Largest WIMP speed in the lab frame
+        q: The grid in q
+        table: |F|^2 on the grid
+        max_error: Largest midpoint error in the final check
+        disk_cache: Use the on-disk table cache
+    """
+
+    def __init__(self,form_factor=None):
+        """ Initialize with a form factor to wrap.
+
+            Args:
+                form_factor: (FormFactor) defaults to the
+                             base class
+        """
+        if form_factor is None:
+            form_factor = FormFactor()
+        self.form_factor = form_factor
+        self.rtol = 1e-6
+        self.atol = 1e-10
+        self.ninit = 65
+        self.max_points = 100000
+        self.Q2max = None
+        self.Mt = 100 * units.GeV
+        self.Mx = 100 * units.GeV
+        self.vmax = 770 * units.km / units.sec
+        self.q = None
+        self.table = None
+        self.max_error = 0
+        self.disk_cache = False
+        self._spline = None
+        self._rand = np.random
+
+    @property
+    def random(self):
+        """ Random number generator."""
+        return self._rand
+
+    @random.setter
+    def random(self,r):
+        """ Set the random number generator.
+
+            Args:
+                r: (Numpy RandomState)
+        """
+        self._rand = r
+        self.form_factor.random = r
+
+    def set_params(self,pars):
+        """ Set parameters from a dictionary. The parameters
+            are also passed to the wrapped form factor.
+
+            Args:
+                pars: {string}
+
+            Parameters:
+                Mt: Target nucleus mass
+                Mx: WIMP mass
+                vesc, vE: The table range uses the speed
+                          vesc + |vE|
+                TabFFQ2Max: Upper end of the table
+                TabFFRtol: Relative interpolation tolerance
+                TabFFAtol: Absolute interpolation tolerance
+                TabFFMaxPoints: Maximum number of grid points
+                TabFFDiskCache: Use the on-disk table cache
+        """
+        self.form_factor.set_params(pars)
+        if 'Mt' in pars:
+            self.Mt = pars['Mt']
+        if 'Mx' in pars:
+            self.Mx = pars['Mx']
+        if 'vesc' in pars or 'vE' in pars:
+            vesc = pars.get('vesc',550 * units.km / units.sec)
+            vE = np.asarray(pars.get('vE',
+                     220 * units.km / units.sec * np.array([0,0,1])))
+            self.vmax = vesc + np.sqrt(vE.dot(vE))
+        if 'TabFFQ2Max' in pars:
+            self.Q2max = pars['TabFFQ2Max']
+        if 'TabFFRtol' in pars:
+            self.rtol = pars['TabFFRtol']
+        if 'TabFFAtol' in pars:
+            self.atol = pars['TabFFAtol']
+        if 'TabFFMaxPoints' in pars:
+            self.max_points = pars['TabFFMaxPoints']
+        if 'TabFFDiskCache' in pars:
+            self.disk_cache = pars['TabFFDiskCache']
+
+    def set_range(self,Mt,Mx,vmax):
+        """ Set the table range from the kinematics.
+
+            Args:
+                Mt: Target nucleus mass
+                Mx: WIMP mass
+                vmax: Largest WIMP speed in the lab frame
+        """
+        self.Mt = Mt
+        self.Mx = Mx
+        self.vmax = vmax
+        self.Q2max = None
+
+    def table_Q2max(self):
+        """ The upper end of the table in Q^2. """
+        if self.Q2max is not None:
+            return self.Q2max
+        mu = self.Mx * self.Mt / (self.Mx + self.Mt)
+        beta = self.vmax / units.speed_of_light
+        Ermax = 2 * mu * mu * beta * beta / self.Mt
+        return 2 * self.Mt * Ermax
+
+    def initialize(self):
+        """ Initialize the wrapped form factor and build
+            the table.
+        """
+        self.form_factor.initialize()
+        grid = (self.table_Q2max(),self.rtol,self.atol,
+                self.ninit,self.max_points)
+        if self.disk_cache:
+            cached = ff_cache.load(self.form_factor,grid)
+            if cached is not None:
+                self.q = cached['q']
+                self.table = cached['table']
+                self.max_error = float(cached['max_error'])
+                self._spline = scipy.interpolate.CubicSpline(self.q,
+                                                             self.table)
+                return
+
+        qmax = np.sqrt(self.table_Q2max())
+        q = np.linspace(0,qmax,self.ninit)
+        f = self.form_factor.ff2(q*q)
+
+        while True:
+            spline = scipy.interpolate.CubicSpline(q,f)
+            qmid = 0.5 * (q[1:] + q[:-1])
+            fmid = self.form_factor.ff2(qmid*qmid)
+            err = np.abs(spline(qmid) - fmid)
+            # Half the tolerance at the midpoints leaves a margin
+            # for the error elsewhere in each interval
+            bad = err > 0.5 * (self.atol + self.rtol * np.abs(fmid))
+            if not np.any(bad) or q.shape[0] >= self.max_points:
+                break
+            order = np.argsort(np.concatenate((q,qmid[bad])))
+            q = np.concatenate((q,qmid[bad]))[order]
+            f = np.concatenate((f,fmid[bad]))[order]
+
+        if np.any(bad):
+            print('TabulatedFormFactor: Tolerance not reached with',
+                  q.shape[0],'points')
+        self.max_error = np.max(err)
+        self.q = q
+        self.table = f
+        self._spline = spline
+        if self.disk_cache:
+            ff_cache.save(self.form_factor,grid,q=q,table=f,
+                          max_error=self.max_error)
+
+    def ff2(self,Q2):
+        """ Calculate |F(Q^2)|^2 from the table.
+
+            Args:
+                Q2: Recoil squared momentum transfer (value or array)
+        """
+        Q2 = np.asarray(Q2,dtype=float)
+        q = np.sqrt(Q2)
+        inside = q <= self.q[-1]
+        if np.all(inside):
+            return self._spline(q)[()]
+        f = np.empty(q.shape)
+        f[inside] = self._spline(q[inside])
+        f[~inside] = self.form_factor.ff2(Q2[~inside])
+        return f[()]
@@ -5,6 +5,7 @@ The form factor of a thin shell charge distribution.
 """
 from . import FormFactor
 from .. import units
+from .. import mathtools
 import numpy as np
 
 class ThinShellFormFactor(FormFactor):
@@ -69,11 +70,10 @@ class ThinShellFormFactor(FormFactor):
         """ Calculate |F(Q^2)|^2.
  
             Args:
-                Q2: Recoil squared momentum transfer
+                Q2: Recoil squared momentum transfer (value or array)
         """
 
-        qrn = np.sqrt(Q2)*self.rn / units.hbarc
-         
-        f = np.sin(qrn) / qrn
+        qrn = np.sqrt(np.asarray(Q2,dtype=float))*self.rn / units.hbarc
+        f = mathtools.sph_j0(qrn)
 
-        return f*f
+        return (f*f)[()]
@@ -14,8 +14,10 @@ __copyright__ = '(c) 2017, Jeremy P. Lopez'
 
 from .FormFactor import FormFactor
 from .. import units
+from .. import mathtools
 
 import numpy as np
+import scipy.special
 
 WSData = {
         (11,23):(2.9393*units.fm,2.994*units.fm,0.523*units.fm),
@@ -30,18 +32,33 @@ WSData = {
                   0.03*units.fm,0.04*units.fm,0.23*units.fm) #errors
        }
 
-class WSFormFactor:
+class WSFormFactor(FormFactor):
     """ The Woods-Saxon form factor. 
 
     This is a form factor associated with the charge density
     p(r) = p0 [1 + exp( (r - c)/a )].
  
-    There is no closed form solution, so we calculate it
-    numerically up to a given tolerance using Romberg
-    integration. The Helm form factor ought to be nearly
+    There is no closed form solution, so by default we
+    calculate it numerically up to a given tolerance using
+    Romberg integration. The Helm form factor ought to be nearly
     identical with the correct choice of parameters.
 
+    The mode attribute selects the calculation:
+        'romberg': Romberg integration to the tolerance _tol
+        'gauss': A fixed Gauss-Legendre rule with gauss_nodes
+                 points in the arctan variable, evaluated for
+                 all momenta at once
+        'sfermi': The closed form for the symmetrized Fermi
+                  density, which differs from Woods-Saxon by
+                  terms of order exp(-c/a)
+
+    The data are packaged as (c, rms radius, a), optionally
+    followed by their errors.
+
     """
+    # Number of momenta integrated together
+    _chunk = 1024
+
     def __init__(self, data=WSData[(11,23)]):
         """ Initialize with argon as the default. 
  
@@ -52,10 +69,12 @@ class WSFormFactor:
         """
 
         self.c = data[0]
-        self.a = data[1]
+        self.a = data[2]
 
         self.F0 = 1
         self._tol = 1e-4
+        self.mode = 'romberg'
+        self.gauss_nodes = 256
         self.random = np.random
  
     def initialize(self):
@@ -69,10 +88,12 @@ class WSFormFactor:
 
             Args:
                 data: The nuclear data needed for this calculation
-                      Given in units of inverse energy (length/ (hbar*c) )
+                      Given in units of length
             
         """
         self._data = data
+        self.c = data[0]
+        self.a = data[2]
 
     def set_params(self,pars):
         """ Set the parameters from a dictionray
@@ -83,15 +104,24 @@ class WSFormFactor:
             Parameters:
                 WSData: The data in the correct format and in units
                         of inverse energy.
+                WSTol: Romberg integration tolerance
+                WSa: Surface thickness a
+                WSc: Half-density radius c
+                WSMode: 'romberg', 'gauss' or 'sfermi'
+                WSGaussNodes: Number of Gauss-Legendre nodes
         """
         if 'WSData' in pars:
-            self._data = pars['WSData']
+            self.set_data(pars['WSData'])
         if 'WSTol' in pars:
             self._tol = pars['WSTol']
         if 'WSa' in pars:
             self.a = pars['WSa']
         if 'WSc' in pars:
             self.c = pars['WSc']
+        if 'WSMode' in pars:
+            self.mode = pars['WSMode']
+        if 'WSGaussNodes' in pars:
+            self.gauss_nodes = pars['WSGaussNodes']
 
     def _integrand(self,x,q):
         """ The integrand used for integration.
@@ -100,56 +130,150 @@ class WSFormFactor:
             are 0 to pi/2 and the resulting integrand is finite.
         
             Args:
-                x: The unitless parameter arctan(r/a)
-                q: The momentum transfer in units of length
-        """
-        #return 1
-        if (x<=0 or x>= 0.5 * np.pi):
-            return 0
-        r = self.a * np.tan(x)
-        #print(r, (r-self.c)/self.a)
-        if (q <= 0):
-            return (4 * np.pi / self.a * r *r * (1+ (r*r)/(self.a*self.a)) 
-                     / (1+np.exp( (r-self.c)/self.a)) ) 
+                x: The unitless parameter arctan(r/a), shape (m,)
+                q: The momentum transfer in units of inverse length,
+                   shape (k,)
 
+            Returns:
+                The integrand at every (x,q) pair, shape (m,k)
+        """
+        x = np.asarray(x,dtype=float)[:,np.newaxis]
+        inside = (x > 0) & (x < 0.5 * np.pi)
+        r = self.a * np.tan(np.where(inside,x,0))
+        # sin(qr)/q, which goes to r at q = 0
+        sinqr_q = r * mathtools.sph_j0(q * r)
+        # 1/(1+exp((r-c)/a)) without overflows at large r
+        density = scipy.special.expit(-(r-self.c)/self.a)
 
-        return (4 * np.pi/q / self.a * r * (1+r*r/self.a/self.a) * np.sin(q*r) 
-                 / (1+np.exp( (r-self.c)/self.a)) )
+        return np.where(inside,
+                        4 * np.pi / self.a * r * (1+r*r/self.a/self.a)
+                        * sinqr_q * density,
+                        0)
 
     def ff2(self,Q2):
         """ Calculate the form factor as a function of Q^2. 
 
             Args:
-                Q2: The squared momentum transfer (a positive value)
+                Q2: The squared momentum transfer (a positive value
+                    or an array of them)
+        """
+        Q2 = np.maximum(np.asarray(Q2,dtype=float),0)
+        q_h = np.sqrt(Q2).reshape(-1)/units.hbarc
+
+        if self.mode == 'sfermi':
+            F = self._sfermi(q_h)
+            return (F.reshape(Q2.shape)**2)[()]
+
+        if self.mode == 'gauss':
+            integrate = self._gauss
+        elif self.mode == 'romberg':
+            integrate = self._romberg
+        else:
+            raise ValueError('Unknown WSFormFactor mode: ' + str(self.mode))
+
+        # Integrate a limited number of momenta at once to keep
+        # the (points, momenta) arrays a reasonable size
+        F = np.concatenate([integrate(q_h[i:i+self._chunk])
+                            for i in range(0,q_h.size,self._chunk)])
+
+        return (F.reshape(Q2.shape)**2 / self.F0)[()]
+
+    def check_accuracy(self,Q2):
+        """ Compare the current mode with Romberg integration.
+
+            Args:
+                Q2: The squared momentum transfers to check
+
+            Returns:
+                The largest absolute difference in |F|^2
         """
+        mode = self.mode
+        try:
+            self.mode = 'romberg'
+            self.initialize()
+            ref = self.ff2(Q2)
+        finally:
+            self.mode = mode
+        self.initialize()
+        return np.max(np.abs(self.ff2(Q2) - ref))
+
+    def _gauss(self,q_h):
+        """ Gauss-Legendre integration of the form factor for
+            an array of momentum transfers.
 
-        q_h = np.sqrt(Q2)/units.hbarc
-    
+            Args:
+                q_h: Momentum transfers in units of inverse length (k,)
+
+            Returns:
+                The unnormalized form factors (k,)
+        """
+        x,w = np.polynomial.legendre.leggauss(self.gauss_nodes)
+        x = 0.25 * np.pi * (x + 1)
+        w = 0.25 * np.pi * w
+        return w.dot(self._integrand(x,q_h))
+
+    def _sfermi(self,q_h):
+        """ Normalized form factor of the symmetrized Fermi
+            density,
+            p(r) = p0 sinh(c/a) / (cosh(r/a) + cosh(c/a)).
+
+            Args:
+                q_h: Momentum transfers in units of inverse length (k,)
+
+            Returns:
+                The normalized form factors (k,)
+        """
+        # Use the series 1 - q^2 <r^2>/6 where the closed form
+        # loses precision to cancellations
+        small = q_h * self.c < 1e-2
+        q = np.where(small,1./self.c,q_h)
+        qc = q * self.c
+        pqa = np.pi * q * self.a
+        with np.errstate(divide='ignore',invalid='ignore'):
+            # x/sinh(x) and x/tanh(x) both go to 1 at x = 0
+            x_sinh = np.where(pqa > 0,pqa / np.sinh(pqa),1.)
+            x_tanh = np.where(pqa > 0,pqa / np.tanh(pqa),1.)
+        F = (3. / (qc * (qc*qc + pqa*pqa)) * x_sinh
+             * (x_tanh * np.sin(qc) - qc * np.cos(qc)))
+        r2 = 0.6 * self.c * self.c + 1.4 * (np.pi * self.a)**2
+        return np.where(small,1 - q_h * q_h * r2 / 6.,F)
+
+    def _romberg(self,q_h):
+        """ Romberg integration of the form factor for an array
+            of momentum transfers. All momenta share the same
+            points and iterate until every one has converged.
+
+            Args:
+                q_h: Momentum transfers in units of inverse length (k,)
+
+            Returns:
+                The unnormalized form factors (k,)
+        """
         # Romberg's method of integration
         # We use a tangent change of variables to
         # transform from 0-->infty to 0-->pi/2
 
-        stop_loop = False 
         n = 1
-        R = [np.array([0])]
+        R = [np.zeros((1,q_h.size))]
         while(1):
-            R.append(np.zeros(n+1) )
+            R.append(np.zeros((n+1,q_h.size)) )
             hn = 0.5**(n+1) * np.pi
-           
-            arr = [self._integrand((2*k-1)*hn,q_h) for k in range(1,2**(n-1)+1)]
-            #print(arr)
-            
-            R[n][0] = 0.5*R[n-1][0] + hn * np.sum(np.array(arr) )
-                     
+
+            x = (2*np.arange(1,2**(n-1)+1)-1)*hn
+            R[n][0] = 0.5*R[n-1][0] + hn * np.sum(self._integrand(x,q_h),
+                                                  axis=0)
+
             for m in range(1,n+1):
                 R[n][m] = R[n][m-1] + 1./(4**m-1) *(R[n][m-1]-R[n-1][m-1])
-        
-            if (n > 4
-                and np.abs(1-R[n][n]/R[n-1][n-1]) < self._tol
-                and np.abs(1-R[n][n]/R[n][n-2]) < self._tol
-                and np.abs(1-R[n][n]/R[n][n-3]) < self._tol):
-                break
-            
+
+            if n > 4:
+                with np.errstate(divide='ignore',invalid='ignore'):
+                    done = ((np.abs(1-R[n][n]/R[n-1][n-1]) < self._tol)
+                            & (np.abs(1-R[n][n]/R[n][n-2]) < self._tol)
+                            & (np.abs(1-R[n][n]/R[n][n-3]) < self._tol))
+                if np.all(done):
+                    break
+
             n = n+1
-        
-        return R[n][n]**2 / self.F0
+
+        return R[n][n]
@@ -17,3 +17,5 @@ from .SolidSphereFormFactor import SolidSphereFormFactor
 from .ThinShellFormFactor import ThinShellFormFactor
 from .WSFormFactor import WSFormFactor
 from .WSFormFactor import WSData
+from .TabulatedFormFactor import TabulatedFormFactor
+from . import ff_cache
@@ -0,0 +1,156 @@
+""" ff_cache.py
+
+    On-disk cache for tabulated form factors.
+
+    Tables are stored as .npz files named after the form
+    factor class and a hash of its parameters and of the
+    table grid, so any process with the same setup can
+    reuse them. The directory is $PYWIMPS_CACHE_DIR if set,
+    otherwise pywimps/ in $XDG_CACHE_HOME or ~/.cache.
+
+    Files are written by savez_atomic() to a temporary file
+    in the cache directory and moved into place with
+    os.replace(), so
+    readers never see partial files and concurrent writers
+    of the same table do not interfere.
+"""
+__author__    = "Jeremy P. Lopez"
+__date__      = "June 2017"
+__copyright__ = "(c) 2017, Jeremy P. Lopez"
+
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+
+def cache_dir():
+    """ The cache directory.
+
+        Returns:
+            The directory path (may not exist yet)
+    """
+    if os.environ.get('PYWIMPS_CACHE_DIR'):
+        return os.environ['PYWIMPS_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or \
+           os.path.join(os.path.expanduser('~'),'.cache')
+    return os.path.join(base,'pywimps')
+
+def _update_hash(h,value):
+    """ Add a parameter value to a hash.
+
+        Args:
+            h: hashlib object
+            value: A number, string, array, sequence,
+                   dictionary or object with attributes
+    """
+    if isinstance(value,np.ndarray):
+        h.update(str(value.dtype).encode())
+        h.update(str(value.shape).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value,(list,tuple)):
+        h.update(b'(')
+        for v in value:
+            _update_hash(h,v)
+            h.update(b',')
+        h.update(b')')
+    elif isinstance(value,dict):
+        h.update(b'{')
+        for k in sorted(value,key=repr):
+            h.update(repr(k).encode())
+            _update_hash(h,value[k])
+        h.update(b'}')
+    elif isinstance(value,(bool,int,float,complex,str,bytes,np.generic)) \
+            or value is None:
+        h.update(repr(value).encode())
+    elif hasattr(value,'__dict__'):
+        h.update(type(value).__name__.encode())
+        # The random number generator does not change the curve
+        _update_hash(h,{k:v for k,v in vars(value).items()
+                        if k not in ('_rand','random')})
+    else:
+        h.update(repr(value).encode())
+
+def cache_key(form_factor,grid):
+    """ Key for a form factor table.
+
+        Args:
+            form_factor: The FormFactor being tabulated
+            grid: Anything that defines the table grid
+                  (e.g. range and tolerances)
+
+        Returns:
+            The file name for the table
+    """
+    h = hashlib.sha1()
+    _update_hash(h,form_factor)
+    _update_hash(h,grid)
+    return type(form_factor).__name__ + '_' + h.hexdigest() + '.npz'
+
+def load(form_factor,grid):
+    """ Load a table from the cache.
+
+        Args:
+            form_factor: The FormFactor being tabulated
+            grid: Anything that defines the table grid
+
+        Returns:
+            A dictionary of the stored arrays, or None if there
+            is no usable table
+    """
+    path = os.path.join(cache_dir(),cache_key(form_factor,grid))
+    try:
+        with np.load(path) as f:
+            return {k:f[k] for k in f.files}
+    except Exception:
+        return None
+
+def savez_atomic(path,compressed=False,**arrays):
+    """ Write arrays to a .npz file. The data go to a temporary
+        file in the same directory, which is then moved into
+        place, so readers never see a partial file.
+
+        Args:
+            path: The file name
+            compressed: Use np.savez_compressed()
+            arrays: The arrays to store
+
+        Raises:
+            OSError if the file cannot be written. The temporary
+            file is removed on any failure.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd,tmp = tempfile.mkstemp(dir=directory,suffix='.tmp')
+    try:
+        with os.fdopen(fd,'wb') as f:
+            if compressed:
+                np.savez_compressed(f,**arrays)
+            else:
+                np.savez(f,**arrays)
+        os.replace(tmp,path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def save(form_factor,grid,**arrays):
+    """ Save a table to the cache. Failures only print a
+        warning, since the cache is just an optimization.
+
+        Args:
+            form_factor: The FormFactor being tabulated
+            grid: Anything that defines the table grid
+            arrays: The arrays to store
+
+        Returns:
+            The path of the table, or None if it was not saved
+    """
+    directory = cache_dir()
+    path = os.path.join(directory,cache_key(form_factor,grid))
+    try:
+        os.makedirs(directory,exist_ok=True)
+        savez_atomic(path,**arrays)
+    except OSError as e:
+        print('ff_cache: could not save',path,':',e)
+        return None
+    return path